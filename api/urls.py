@@ -1,6 +1,7 @@
 from django.urls import path, include
-from authentication.views import CustomerSignUpView, VendorSignUpView, VerifyAccount, RequestNewOTP, LoginView, LogoutView, PasswordResetRequestView, PasswordResetView, UploadProfilePicView
-from vendor.views import CategoryView, CategoryDetailView, ProductView
+from django.views.decorators.csrf import csrf_exempt
+from authentication.views import CustomerSignUpView, VendorSignUpView, VerifyAccount, RequestNewOTP, LoginView, AsyncLoginView, RefreshTokenView, LogoutView, PasswordResetRequestView, PasswordResetView, UploadProfilePicView
+from vendor.views import CategoryView, CategoryDetailView, CategorySlugDetailView, ProductView, ProductBatchView, ProductChangesView
 
 
 urlpatterns = [
@@ -10,6 +11,8 @@ urlpatterns = [
     path("auth/verify_acount/", VerifyAccount.as_view()),
     path("auth/request_otp/", RequestNewOTP.as_view()),
     path("auth/login/", LoginView.as_view()),
+    path("auth/login/async/", csrf_exempt(AsyncLoginView.as_view())),
+    path("auth/token/refresh/", RefreshTokenView.as_view()),
     path("auth/logout/", LogoutView.as_view()),
     path("auth/forgot_password/", PasswordResetRequestView.as_view()),
     path("auth/reset_password/", PasswordResetView.as_view()),
@@ -18,9 +21,12 @@ urlpatterns = [
     # Category
     path("category/", CategoryView.as_view()),
     path("category/<int:pk>/", CategoryDetailView.as_view()),
+    path("category/slug/<slug:slug>/", CategorySlugDetailView.as_view()),
     
     # Product
     path("products/", ProductView.as_view()),
+    path("products/batch/", ProductBatchView.as_view()),
+    path("products/changes/", ProductChangesView.as_view()),
     
     # Vendor
     path("vendor/", include("vendor.urls")),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Userprofile, EmailOTP, PasswordResetToken
+from .models import User, Userprofile, EmailOTP, PasswordResetToken, EmailOutbox
 from django.contrib.auth.admin import UserAdmin
 
 
@@ -19,8 +19,14 @@ class UserProfileAdmin(admin.ModelAdmin):
         return f"{obj.user.first_name} {obj.user.last_name}"
     full_name.admin_order_field = "user__first_name" 
     full_name.short_description = "Full Name"
+
+
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipients", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
     
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Userprofile, UserProfileAdmin)
 admin.site.register(EmailOTP)
-admin.site.register(PasswordResetToken)
\ No newline at end of file
+admin.site.register(PasswordResetToken)
+admin.site.register(EmailOutbox, EmailOutboxAdmin)
\ No newline at end of file
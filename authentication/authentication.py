@@ -0,0 +1,42 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+
+
+# User fields copied into tokens by User.token()
+TOKEN_USER_CLAIMS = ("role", "is_active", "is_staff", "is_admin", "is_superuser")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the access token's claims instead of loading the row.
+    The user is a real User instance with only its id and TOKEN_USER_CLAIMS loaded, so permissions
+    (IsVendor, IsCustomer, IsAdminUser) and foreign keys work without a query; any other field is
+    fetched from the database the first time a view reads it.
+    Reading a field that isn't a claim (email, names, ...) costs one query per field, so views that need
+    those should load the user (or its profile) explicitly.
+    Tokens issued before the claims existed fall back to the regular lookup. Role, activation and
+    staff changes take effect once the user's current access token expires, i.e. after up to
+    ACCESS_TOKEN_LIFETIME (see SIMPLE_JWT in settings).
+    """
+    
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in TOKEN_USER_CLAIMS):
+            return super().get_user(validated_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the stored password hash, which needs the row.
+            return super().get_user(validated_token)
+        
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        
+        # simplejwt stores the id as a string; convert it so request.user compares equal to loaded users.
+        user_id = User._meta.get_field(api_settings.USER_ID_FIELD).to_python(user_id)
+        loaded = {api_settings.USER_ID_FIELD: user_id, **{claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS}}
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+        return User.from_db(User.objects.db, field_names, [loaded[name] for name in field_names])
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+from math import ceil, log
+from django.conf import settings
+from django.db import connection
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, about `error_rate` false positives at `capacity`"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = ceil(-capacity * log(error_rate) / log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    """
+    Per-process Bloom filter of blacklisted refresh-token JTIs.
+    It is built in a background thread the first time it is needed, so no request waits for the whole table;
+    until then every check goes to the database. Once built it is topped up from BlacklistedToken rows with a
+    higher id than the last one seen, at most once every TOKEN_BLACKLIST_FILTER_REFRESH_SECONDS. Ids are handed
+    out before commit, so a row can show up after higher ids have been read; every top-up therefore re-reads the
+    last TOKEN_BLACKLIST_FILTER_OVERLAP_ROWS ids too (adding a JTI twice is harmless). It is rebuilt
+    (again in the background, still answering from the old one) when it outgrows its capacity or when
+    prune_tokens has removed rows, which shows up as the lowest id moving past the one seen at the last build.
+    The filter and its bookkeeping are only read and replaced under `lock`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = None
+        self.count = 0
+        self.first_id = None
+        self.last_id = 0
+        self.refreshed_at = 0.0
+        self.building = False
+        self.added_while_building = []
+
+    def rows_after(self, last_id):
+        """(id, jti) of the BlacklistedToken rows after `last_id`, in id order"""
+        rows = BlacklistedToken.objects.filter(id__gt=last_id).order_by("id").values_list("id", "token__jti")
+        return list(rows.iterator(chunk_size=5000))
+
+    def first_row_id(self):
+        return BlacklistedToken.objects.order_by("id").values_list("id", flat=True).first()
+
+    def start_build(self):
+        with self.lock:
+            if self.building:
+                return
+            self.building = True
+            self.added_while_building = []
+        threading.Thread(target=self.build, name="blacklist-filter-build", daemon=True).start()
+
+    def build(self):
+        """Load every blacklisted JTI into a new filter and swap it in"""
+        try:
+            first_id = self.first_row_id()
+            rows = self.rows_after(0)
+            bloom = BloomFilter(max(settings.TOKEN_BLACKLIST_FILTER_CAPACITY, len(rows) * 2))
+            for _, jti in rows:
+                bloom.add(jti)
+            with self.lock:
+                # Tokens this process blacklisted meanwhile only reached the old filter.
+                for jti in self.added_while_building:
+                    bloom.add(jti)
+                self.filter, self.count = bloom, len(rows) + len(self.added_while_building)
+                self.first_id, self.last_id = first_id, rows[-1][0] if rows else 0
+                self.refreshed_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.building = False
+                self.added_while_building = []
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+    def top_up(self):
+        with self.lock:
+            if self.filter is None or self.building:
+                return
+            bloom, last_id = self.filter, self.last_id
+            # Claimed up front so concurrent requests don't all run the same query.
+            self.refreshed_at = time.monotonic()
+        rows = self.rows_after(max(0, last_id - settings.TOKEN_BLACKLIST_FILTER_OVERLAP_ROWS))
+        pruned = self.first_id is not None and (self.first_row_id() or 0) != self.first_id
+        with self.lock:
+            if self.filter is not bloom:
+                return
+            for row_id, jti in rows:
+                bloom.add(jti)
+                if row_id > self.last_id:
+                    self.last_id = row_id
+                    self.count += 1
+            if self.first_id is None and rows:
+                self.first_id = rows[0][0]
+            outgrown = self.count >= bloom.capacity
+        if pruned or outgrown:
+            self.start_build()
+
+    def might_contain(self, jti):
+        """False only if `jti` is certainly not blacklisted; True means the database has to be asked"""
+        with self.lock:
+            bloom = self.filter
+            stale = time.monotonic() - self.refreshed_at > settings.TOKEN_BLACKLIST_FILTER_REFRESH_SECONDS
+        if bloom is None:
+            self.start_build()
+            return True
+        if stale:
+            self.top_up()
+            with self.lock:
+                bloom = self.filter
+        with self.lock:
+            return jti in bloom
+
+    def add(self, jti):
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+            if self.building:
+                self.added_while_building.append(jti)
+
+    def reset(self):
+        with self.lock:
+            self.filter = None
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check only reaches the DB when the Bloom filter says the JTI may be revoked.
+    A token blacklisted by another process is caught once this process next refreshes its filter.
+    """
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
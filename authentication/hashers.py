@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, make_password, verify_password
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with cost parameters from settings (ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM).
+    Changing them makes Django rehash each password on the user's next login.
+    """
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+_hashing_pool = None
+
+
+def hashing_pool():
+    """Bounded pool for password hashing; hashlib and argon2 release the GIL, so it scales across cores"""
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix="password-hashing"
+        )
+    return _hashing_pool
+
+
+async def run_in_hashing_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(hashing_pool(), func, *args)
+
+
+async def acheck_password(user, raw_password):
+    """
+    Async User.check_password() that hashes on the bounded pool instead of the event loop.
+    Like the sync version, a correct password stored with an outdated hasher or cost is rehashed and saved.
+    """
+    is_correct, must_update = await run_in_hashing_pool(verify_password, raw_password, user.password)
+    if is_correct and must_update:
+        user.password = await run_in_hashing_pool(make_password, raw_password)
+        await user.asave(update_fields=["password"])
+    return is_correct
@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Measure password checks (logins) per second for each configured hasher, on one thread and on the hashing pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20, help="Checks per thread")
+        parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASHING_WORKERS)
+
+    def handle(self, *args, **options):
+        iterations, workers = options["iterations"], options["workers"]
+        password = "correct horse battery staple"
+
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode(password, hasher.salt())
+            except ValueError as e:
+                self.stdout.write(f"{type(hasher).__name__}: skipped ({e})")
+                continue
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                hasher.verify(password, encoded)
+            single = iterations / (time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda _: hasher.verify(password, encoded), range(iterations * workers)))
+            pooled = iterations * workers / (time.perf_counter() - started)
+
+            self.stdout.write(
+                f"{type(hasher).__name__}: {single:.1f} logins/s on one thread, "
+                f"{pooled:.1f} logins/s on {workers} threads ({pooled / workers:.1f}/s per thread)"
+            )
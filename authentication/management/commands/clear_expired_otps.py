@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from authentication.models import EmailOTP, OTP_LIFETIME
+
+
+class Command(BaseCommand):
+    help = "Delete expired EmailOTP rows in batches (also clears rows left behind after switching to the cache OTP store)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = EmailOTP.objects.filter(created_at__lt=now() - OTP_LIFETIME)
+        deleted = 0
+        while True:
+            ids = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            deleted += EmailOTP.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(f"Deleted {deleted} expired OTP(s)")
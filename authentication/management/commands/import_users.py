@@ -0,0 +1,118 @@
+import csv
+import time
+from itertools import islice
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from authentication.hashers import hashing_pool
+from authentication.models import User, Userprofile
+from authentication.otp import get_otp_store
+from authentication.utils import send_otps
+
+
+ROLES = {"vendor": User.VENDOR, "customer": User.CUSTOMER, str(User.VENDOR): User.VENDOR, str(User.CUSTOMER): User.CUSTOMER}
+
+
+class Command(BaseCommand):
+    help = """
+    Bulk-create users (and their profiles) from a CSV with the columns
+    email, first_name, last_name and optionally phone_number, business_name, role, password.
+    Rows are inserted in chunks with bulk_create, so the per-user signals (profile, OTP email) don't fire;
+    emails that already exist are skipped.
+    No OTPs are issued by default: codes live OTP_LIFETIME (5 minutes), far less than the outbox needs to deliver
+    a large import, so they would arrive dead and clog the queue. Imported accounts that aren't --active ask for
+    their code through the request-OTP endpoint when they first sign in; --send-otp issues and emails them now,
+    which only suits small imports.
+    """
+    # How often a chunk is retried when a signup takes one of its emails between the check and the insert.
+    conflict_retries = 3
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--role", choices=["customer", "vendor"], default="customer",
+                            help="Role for rows without a role column")
+        parser.add_argument("--hashed", action="store_true",
+                            help="The password column already holds Django password hashes (e.g. argon2$..., pbkdf2_sha256$...)")
+        parser.add_argument("--active", action="store_true", help="Import the accounts as already verified")
+        parser.add_argument("--send-otp", action="store_true",
+                            help="Issue OTPs and queue verification emails now (small imports only: codes expire in 5 minutes)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = skipped = 0
+        with open(options["csv_path"], newline="", encoding="utf-8") as csv_file:
+            rows = csv.DictReader(csv_file)
+            missing = {"email", "first_name", "last_name"} - set(rows.fieldnames or [])
+            if missing:
+                raise CommandError(f"CSV is missing the column(s): {', '.join(sorted(missing))}")
+
+            while chunk := list(islice(rows, options["batch_size"])):
+                chunk_created = self.import_chunk(chunk, options)
+                created += chunk_created
+                skipped += len(chunk) - chunk_created
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{created} user(s) imported, {skipped} skipped ({created / elapsed:.0f} users/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} user(s), skipped {skipped}"))
+
+    def import_chunk(self, chunk, options):
+        users = {}
+        for row in chunk:
+            email = User.objects.normalize_email((row.get("email") or "").strip())
+            if not email or email in users or not row.get("first_name") or not row.get("last_name"):
+                continue
+            users[email] = User(
+                email=email,
+                # bulk_create skips User.save(), which normally title-cases the names.
+                first_name=row["first_name"].strip().title(),
+                last_name=row["last_name"].strip().title(),
+                phone_number=row.get("phone_number") or None,
+                business_name=row.get("business_name") or None,
+                role=ROLES.get((row.get("role") or options["role"]).strip().lower(), ROLES[options["role"]]),
+                password=row.get("password") or "",
+                is_active=options["active"],
+            )
+
+        self.skip_existing(users)
+        if not users:
+            return 0
+
+        self.set_passwords(users.values(), options["hashed"])
+        for attempt in range(self.conflict_retries):
+            try:
+                return self.create_users(list(users.values()), options)
+            except IntegrityError:
+                # Someone signed up with one of these emails since the check; the chunk was rolled back.
+                if attempt == self.conflict_retries - 1:
+                    raise
+                self.skip_existing(users)
+                if not users:
+                    return 0
+
+    def skip_existing(self, users):
+        for email in User.objects.filter(email__in=list(users)).values_list("email", flat=True):
+            del users[email]
+
+    def create_users(self, users, options):
+        with transaction.atomic():
+            users = User.objects.bulk_create(users)
+            Userprofile.objects.bulk_create([Userprofile(user=user) for user in users])
+            if options["send_otp"] and not options["active"]:
+                send_otps(get_otp_store().issue_many(users))
+        return len(users)
+
+    def set_passwords(self, users, hashed):
+        if hashed:
+            for user in users:
+                try:
+                    identify_hasher(user.password)
+                except ValueError:
+                    # Unknown or empty hash: the user has to go through password reset.
+                    user.password = make_password(None)
+            return
+
+        # Raw passwords are hashed on the shared hashing pool; rows without one get an unusable password.
+        passwords = hashing_pool().map(lambda raw: make_password(raw or None), [user.password for user in users])
+        for user, password in zip(users, passwords):
+            user.password = password
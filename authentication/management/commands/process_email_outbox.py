@@ -0,0 +1,41 @@
+import time
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from authentication.utils import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox over one reused SMTP connection, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--poll-interval", type=float, default=5, help="Seconds to sleep when the outbox is empty")
+        parser.add_argument("--once", action="store_true", help="Drain what is due now and exit")
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total_sent = total_failed = 0
+        started = time.monotonic()
+        try:
+            while True:
+                batch_started = time.monotonic()
+                sent, failed = deliver_queued_emails(options["batch_size"], connection=connection)
+                if sent or failed:
+                    total_sent += sent
+                    total_failed += failed
+                    self.report("Batch", sent, failed, time.monotonic() - batch_started)
+                    continue
+                if options["once"]:
+                    break
+                # Don't hold an idle SMTP session open while waiting; the next batch reconnects.
+                connection.close()
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+            self.report("Total", total_sent, total_failed, time.monotonic() - started)
+
+    def report(self, label, sent, failed, elapsed):
+        rate = sent / elapsed if elapsed else 0
+        self.stdout.write(f"{label}: sent {sent}, failed {failed} in {elapsed:.2f}s ({rate:.1f} emails/s)")
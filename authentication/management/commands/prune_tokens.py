@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired OutstandingToken rows and their BlacklistedToken rows in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # An expired refresh token fails verification on its own, so neither row is needed any more.
+        expired = OutstandingToken.objects.filter(expires_at__lt=now())
+        outstanding = blacklisted = 0
+        while True:
+            ids = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(f"Deleted {outstanding} expired outstanding token(s) and {blacklisted} blacklisted token(s)")
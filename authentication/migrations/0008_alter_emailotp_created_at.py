@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0007_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="emailotp",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
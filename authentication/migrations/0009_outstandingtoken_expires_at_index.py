@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0008_alter_emailotp_created_at"),
+        ("token_blacklist", "__latest__"),
+    ]
+
+    operations = [
+        # token_blacklist is a third-party app, so prune_tokens' expires_at filter gets its index from here.
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS token_blacklist_outstanding_expires_at_idx "
+            "ON token_blacklist_outstandingtoken (expires_at)",
+            reverse_sql="DROP INDEX IF EXISTS token_blacklist_outstanding_expires_at_idx",
+        ),
+    ]
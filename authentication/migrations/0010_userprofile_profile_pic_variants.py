@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0009_outstandingtoken_expires_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="profile_pic_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,13 +1,14 @@
 from django.db import models
+from django.db.models import Q
 from .manager import UserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils.timezone import now
-import random
+import secrets
 from datetime import timedelta
 from cloudinary.models import CloudinaryField
 import uuid
+from .blacklist import FilteredRefreshToken
 
 
 class User(AbstractBaseUser, PermissionsMixin):
@@ -43,6 +44,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The business name as read, so a save can tell whether it changed (vendor.signals) without re-reading the row
+        if "business_name" in field_names:
+            instance._loaded_business_name = values[field_names.index("business_name")]
+        return instance
+    
     @property
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -60,8 +69,13 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.role == self.CUSTOMER
     
     def token(self):
-        refresh = RefreshToken.for_user(self)
+        refresh = FilteredRefreshToken.for_user(self)
+        # Copied into the access token too; ClaimsJWTAuthentication builds request.user from them.
         refresh["role"] = self.role
+        refresh["is_active"] = self.is_active
+        refresh["is_staff"] = self.is_staff
+        refresh["is_admin"] = self.is_admin
+        refresh["is_superuser"] = self.is_superuser
         return {
             'refresh' : str(refresh),
             'access' : str(refresh.access_token)
@@ -77,6 +91,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Userprofile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, blank=True, null=True)
     profile_pic = CloudinaryField("profile_pic", null=True, blank=True)
+    profile_pic_variants = models.JSONField(default=dict, blank=True)
     address = models.CharField(max_length=500, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
@@ -85,24 +100,32 @@ class Userprofile(models.Model):
         return f"{self.user.first_name} {self.user.last_name}"
 
 
+OTP_LIFETIME = timedelta(minutes=5)
+
+
 class EmailOTP(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="email_otp")
     code = models.CharField(max_length=6, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     
     
     def __str__(self):
         return f"{self.user.email} {self.code}"
     
+    @staticmethod
+    def new_code():
+        """A random 6-digit code"""
+        return str(secrets.randbelow(900000) + 100000)
+    
     def generate_otp(self):
         """Generate a 6-digit OTP"""
-        self.code = str(random.randint(100000, 999999))
+        self.code = self.new_code()
         self.created_at = now()
         self.save()
     
     def is_valid(self):
         """Check if OTP is within the 5-minute window"""
-        return now() < self.created_at + timedelta(minutes=5)
+        return now() < self.created_at + OTP_LIFETIME
 
 
 
@@ -113,4 +136,37 @@ class PasswordResetToken(models.Model):
     
     
     def is_expired(self):
-        return (now() - self.created_at).total_seconds() > 1800
\ No newline at end of file
+        return (now() - self.created_at).total_seconds() > 1800
+
+
+
+class EmailOutbox(models.Model):
+    """Emails queued by requests and delivered by the `process_email_outbox` worker"""
+    PENDING = 1
+    SENT = 2
+    FAILED = 3
+    
+    STATUS_CHOICE = (
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed")
+    )
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICE, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=["next_attempt_at"], condition=Q(status=1), name="email_outbox_pending_idx"),  # PENDING
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
@@ -0,0 +1,79 @@
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .models import User, EmailOTP, OTP_LIFETIME
+
+
+VALID = "valid"
+INVALID = "invalid"
+EXPIRED = "expired"
+
+
+class DatabaseOTPStore:
+    """Keeps one EmailOTP row per user; expired rows are removed by `clear_expired_otps`"""
+    
+    def issue(self, user):
+        otp, _ = EmailOTP.objects.get_or_create(user=user)
+        otp.generate_otp()
+        return otp.code
+    
+    def issue_many(self, users):
+        """Issue codes for users that have none yet (e.g. from `import_users`). Returns {email: code}."""
+        otps = EmailOTP.objects.bulk_create([EmailOTP(user=user, code=EmailOTP.new_code()) for user in users])
+        return {otp.user.email: otp.code for otp in otps}
+    
+    def verify(self, email, code):
+        """Returns (status, user). The lookup goes through the unique email and user_id indexes."""
+        otp = EmailOTP.objects.select_related("user").filter(user__email=email, code=code).first()
+        if otp is None:
+            return INVALID, None
+        if not otp.is_valid():
+            return EXPIRED, otp.user
+        return VALID, otp.user
+    
+    def discard(self, user):
+        EmailOTP.objects.filter(user=user).delete()
+
+
+class CacheOTPStore:
+    """
+    Keeps codes in the cache with a native TTL, so nothing has to be cleaned up.
+    An expired code simply isn't there any more and is reported as invalid.
+    """
+    
+    def key(self, email):
+        return f"otp:{email.lower()}"
+    
+    def issue(self, user):
+        code = EmailOTP.new_code()
+        cache.set(self.key(user.email), code, OTP_LIFETIME.total_seconds())
+        return code
+    
+    def issue_many(self, users):
+        codes = {user.email: EmailOTP.new_code() for user in users}
+        cache.set_many({self.key(email): code for email, code in codes.items()}, OTP_LIFETIME.total_seconds())
+        return codes
+    
+    def verify(self, email, code):
+        if cache.get(self.key(email)) != code:
+            return INVALID, None
+        user = User.objects.filter(email=email).first()
+        return (VALID, user) if user else (INVALID, None)
+    
+    def discard(self, user):
+        cache.delete(self.key(user.email))
+
+
+@lru_cache(maxsize=None)
+def get_otp_store():
+    return import_string(settings.OTP_STORE)()
+
+
+@receiver(setting_changed)
+def reset_otp_store(*, setting, **kwargs):
+    """Pick up a new OTP_STORE (override_settings in tests) instead of the first one ever loaded"""
+    if setting == "OTP_STORE":
+        get_otp_store.cache_clear()
@@ -2,6 +2,13 @@ from rest_framework import serializers
 from .models import User, PasswordResetToken, Userprofile
 from django.contrib.auth import authenticate
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from django.db import transaction
+from product.images import discard_variants, variant_url
+from .authentication import TOKEN_USER_CLAIMS
+from .blacklist import FilteredRefreshToken
 
 
 
@@ -79,14 +86,25 @@ class LoginSerializer(serializers.ModelSerializer):
         if not user.is_active:
             raise AuthenticationFailed("Account not active")
         
-        user_token = user.token()
-        return {
-            "email": email,
-            "id": user.id,
-            "full_name": user.get_full_name,
-            "access_token": str(user_token.get("access")),
-            "refresh_token": str(user_token.get("refresh"))
-        }
+        return login_data(user, email)
+
+
+def login_data(user, email):
+    """Response data of a successful login (LoginView and AsyncLoginView)"""
+    user_token = user.token()
+    return {
+        "email": email,
+        "id": user.id,
+        "full_name": user.get_full_name,
+        "access_token": str(user_token.get("access")),
+        "refresh_token": str(user_token.get("refresh"))
+    }
+
+
+
+class LoginCredentialsSerializer(serializers.Serializer):
+    email = serializers.EmailField(max_length=255, min_length=6)
+    password = serializers.CharField(write_only=True, max_length=68)
 
 
 
@@ -95,6 +113,40 @@ class LogoutSerializer(serializers.Serializer):
 
 
 
+class RefreshTokenSerializer(TokenRefreshSerializer):
+    """
+    simplejwt's refresh with the blacklist check going through the Bloom filter (FilteredRefreshToken),
+    and the new access token carrying the user's current claims instead of the ones copied in at login.
+    """
+    token_class = FilteredRefreshToken
+    
+    def validate(self, attrs):
+        try:
+            refresh = self.token_class(attrs["refresh"])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        
+        access = refresh.access_token
+        for claim in TOKEN_USER_CLAIMS:
+            access[claim] = getattr(user, claim)
+        data = {"access": str(access)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
+
+
+
 class PasswordRestRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
     
@@ -154,9 +206,19 @@ class UserProfilePicSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
         if instance.profile_pic:
-            data["profile_pic"] = instance.profile_pic.url
+            request = self.context.get("request")
+            variant = request.query_params.get("variant") if request else None
+            data["profile_pic"] = variant_url(instance.profile_pic_variants, variant, instance.profile_pic.url)
         return  data
     
+    def update(self, instance, validated_data):
+        # New variants come in as `profile_pic_variants`, rendered by UploadProfilePicView before its transaction.
+        old_variants = instance.profile_pic_variants
+        instance = super().update(instance, validated_data)
+        if old_variants and instance.profile_pic_variants is not old_variants:
+            transaction.on_commit(lambda: discard_variants([old_variants]))
+        return instance
+    
     def validate_profile_pic(self, value):
         valid_extensions = ["jpg", "jpeg", "png"]
         file_extension = value.name.split(".")[-1].lower()
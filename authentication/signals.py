@@ -1,35 +1,41 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import User, EmailOTP, Userprofile, PasswordResetToken
-from .utils import send_otp
+from .models import User, Userprofile, PasswordResetToken
+from .otp import get_otp_store
+from .utils import send_otp, queue_email, invalidate_profile
 from django.conf import settings
-from django.core.mail import send_mail
 
 
 @receiver(post_save, sender=User)
 def create_otp(sender, instance, created, **kwargs):
     """Generate OTP and send email after user signup"""
     if created:
-        otp, _ = EmailOTP.objects.get_or_create(user=instance)
-        otp.generate_otp()
-        send_otp(instance.email, otp.code)
+        code = get_otp_store().issue(instance)
+        send_otp(instance.email, code)
 
 
 @receiver(post_save, sender=User)
 def post_save_created_profile(sender, instance, created, **kwargs):
+    """Create the profile with the user; users that predate this get one lazily from the profile views"""
     if created:
-        Userprofile.objects.create(user=instance)
-    else:
-        try:
-            profile = Userprofile.objects.get(user=instance)
-            profile.save()
-        except:
-            Userprofile.objects.create(user=instance)
+        Userprofile.objects.get_or_create(user=instance)
 
 
-@receiver(pre_save, sender=User)
-def pre_save_profile(sender, instance, **kwargs):
-    print(instance.email)
+# Saves that only touch these never change what the profile views render (e.g. update_last_login).
+PROFILE_IRRELEVANT_FIELDS = {"password", "last_login"}
+
+
+@receiver(post_save, sender=User)
+def refresh_profile_for_user(sender, instance, created, update_fields=None, **kwargs):
+    if not created and not (update_fields and set(update_fields) <= PROFILE_IRRELEVANT_FIELDS):
+        invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=Userprofile)
+@receiver(post_delete, sender=Userprofile)
+def refresh_profile(sender, instance, **kwargs):
+    if instance.user_id:
+        invalidate_profile(instance.user_id)
 
 
 @receiver(post_save, sender=PasswordResetToken)
@@ -37,10 +43,9 @@ def send_password_reset_email(sender, instance, created, **kwargs):
     if created:
         base_url = getattr(settings, "SITE_URL", "http://127.0.0.1:8001")
         reset_link = f"{base_url}/api/reset_password/{instance.token}"
-        send_mail(
+        queue_email(
             "Password Reset Request",
             f"Click the link to reset your password: {reset_link}",
             "noreply@example.com",
             [instance.user.email],
-            fail_silently=False,
         )
\ No newline at end of file
@@ -1,3 +1,622 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from smtplib import SMTPRecipientsRefused
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import get_hasher, get_hashers, make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from .management.commands.import_users import Command as ImportUsersCommand
+from .blacklist import BlacklistFilter, FilteredRefreshToken, blacklist_filter
+from .models import EmailOTP, EmailOutbox, OTP_LIFETIME, User, Userprofile, PasswordResetToken
+from .otp import CacheOTPStore, EXPIRED, INVALID, VALID, get_otp_store
+from .throttling import TokenBucketThrottle
+from .utils import claim_queued_emails, deliver_queued_emails, queue_email
 
-# Create your tests here.
+
+class UserMutationQueryCountTests(TestCase):
+    """Saving a user must not read or rewrite its profile; these pin the query count of every endpoint that does"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_signup_creates_a_single_profile(self):
+        self.assertEqual(Userprofile.objects.filter(user=self.user).count(), 1)
+        self.user.save()
+        self.assertEqual(Userprofile.objects.filter(user=self.user).count(), 1)
+
+    def test_saving_a_user_does_not_touch_the_profile(self):
+        with self.assertNumQueries(1):
+            self.user.save()
+
+    def test_verify_account(self):
+        code = get_otp_store().issue(self.user)
+        # savepoint, OTP lookup, user update, OTP delete, release
+        with self.assertNumQueries(5):
+            response = APIClient().post(
+                "/api/auth/verify_acount/", {"email": self.user.email, "otp": code}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_password_reset(self):
+        reset_token = PasswordResetToken.objects.create(user=self.user)
+        # token lookup, user lookup, user update, token delete
+        with self.assertNumQueries(4):
+            response = APIClient().post(
+                "/api/auth/reset_password/",
+                {"token": str(reset_token.token), "new_password": "newsecret", "confirm_password": "newsecret"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_customer_profile_patch(self):
+        self.user.is_active = True
+        self.user.save()
+        # savepoint, profile joined with user, user update, profile update, release
+        with self.assertNumQueries(5):
+            response = self.client_for(self.user).patch(
+                "/api/customer/profile/", {"address": "12 Allen Avenue", "first_name": "ada"}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_vendor_profile_patch(self):
+        vendor = User.objects.create_user(
+            first_name="chi", last_name="eze", email="chi@example.com", password="secret123", role=User.VENDOR
+        )
+        vendor.is_active = True
+        vendor.save()
+        # as above, plus touching the vendor's products because business_name changed (vendor.signals)
+        with self.assertNumQueries(6):
+            response = self.client_for(vendor).patch(
+                "/api/vendor/profile/", {"address": "3 Marina", "business_name": "Chi Stores"}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_read_is_one_query_then_cached(self):
+        self.user.is_active = True
+        self.user.save()
+        client = self.client_for(self.user)
+        with self.assertNumQueries(1):
+            client.get("/api/customer/profile/")
+        with self.assertNumQueries(0):
+            response = client.get("/api/customer/profile/")
+        self.assertEqual(response.json()["message"]["first_name"], "Ada")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch("/api/customer/profile/", {"first_name": "grace"}, format="json")
+        self.assertEqual(client.get("/api/customer/profile/").json()["message"]["first_name"], "Grace")
+
+
+class UploadProfilePicTests(TestCase):
+    def test_fake_image_is_rejected_before_it_is_stored(self):
+        user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        fake = SimpleUploadedFile("me.png", b"GIF89a not really a png", content_type="image/png")
+        response = client.put("/api/upload/profile_pic/", {"profile_pic": fake}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Userprofile.objects.get(user=user).profile_pic)
+
+    def test_variants_are_deleted_when_the_save_rolls_back(self):
+        from PIL import Image
+
+        variant_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, variant_root)
+        variant_storage = {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": variant_root, "base_url": "/media/variants/"},
+        }
+        user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        photo = BytesIO()
+        Image.new("RGB", (400, 300), "teal").save(photo, "PNG")
+        picture = SimpleUploadedFile("me.png", photo.getvalue(), content_type="image/png")
+
+        stored = []
+        store = FileSystemStorage._save
+
+        def record_save(storage, name, content):
+            stored.append(name)
+            return store(storage, name, content)
+
+        with override_settings(STORAGES={**storages.backends, "image_variants": variant_storage}), \
+                mock.patch.object(FileSystemStorage, "_save", record_save), \
+                mock.patch.object(Userprofile, "save", side_effect=DatabaseError("write failed")):
+            with self.assertRaises(DatabaseError):
+                client.put("/api/upload/profile_pic/", {"profile_pic": picture}, format="multipart")
+        self.assertEqual(len(stored), 3)
+        self.assertEqual([files for _, _, files in os.walk(variant_root) if files], [])
+        self.assertEqual(Userprofile.objects.get(user=user).profile_pic_variants, {})
+
+
+class EmailOutboxTests(TestCase):
+    def queue(self, recipient="ada@example.com"):
+        return queue_email("Hello", "Welcome aboard", "store@example.com", [recipient])
+
+    def test_queued_email_rolls_back_with_the_caller(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.queue()
+            raise RuntimeError
+        self.assertFalse(EmailOutbox.objects.exists())
+        self.assertEqual(self.queue().status, EmailOutbox.PENDING)
+
+    def test_claimed_emails_are_hidden_from_other_workers(self):
+        self.queue()
+        self.assertEqual(len(claim_queued_emails(10)), 1)
+        self.assertEqual(claim_queued_emails(10), [])
+
+    def test_command_delivers_the_outbox(self):
+        first, second = self.queue(), self.queue("bola@example.com")
+        output = StringIO()
+        call_command("process_email_outbox", "--once", stdout=output)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["ada@example.com", "bola@example.com"])
+        self.assertEqual(
+            set(EmailOutbox.objects.filter(pk__in=[first.pk, second.pk]).values_list("status", flat=True)),
+            {EmailOutbox.SENT},
+        )
+        self.assertIn("Total: sent 2, failed 0", output.getvalue())
+
+
+class RecordingEmailBackend(locmem.EmailBackend):
+    """locmem backend that remembers every connection made and refuses recipients at bounce.example.com"""
+    connections = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sends = 0
+        RecordingEmailBackend.connections.append(self)
+
+    def send_messages(self, messages):
+        self.sends += 1
+        for message in messages:
+            if any(recipient.endswith("@bounce.example.com") for recipient in message.to):
+                raise SMTPRecipientsRefused({message.to[0]: (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND="authentication.tests.RecordingEmailBackend", EMAIL_OUTBOX_MAX_ATTEMPTS=3
+)
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        RecordingEmailBackend.connections = []
+
+    def queue(self, recipient):
+        return queue_email("Hello", "Welcome aboard", "store@example.com", [recipient])
+
+    def test_one_connection_per_batch(self):
+        for index in range(5):
+            self.queue(f"user{index}@example.com")
+        self.assertEqual(deliver_queued_emails(batch_size=10), (5, 0))
+        [connection] = RecordingEmailBackend.connections
+        self.assertEqual(connection.sends, 5)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failed_send_is_charged_to_its_row_and_rescheduled(self):
+        good = self.queue("ada@example.com")
+        bad = self.queue("nobody@bounce.example.com")
+        before = now()
+        with mock.patch("authentication.utils.retry_delay", return_value=timedelta(minutes=7)) as retry_delay:
+            self.assertEqual(deliver_queued_emails(), (1, 1))
+        retry_delay.assert_called_once_with(1)
+
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.status, good.attempts), (EmailOutbox.SENT, 0))
+        self.assertEqual((bad.status, bad.attempts), (EmailOutbox.PENDING, 1))
+        self.assertIn("No such user", bad.last_error)
+        self.assertGreaterEqual(bad.next_attempt_at, before + timedelta(minutes=7))
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+
+    def test_row_fails_after_the_last_attempt(self):
+        bad = self.queue("nobody@bounce.example.com")
+        for attempt in range(1, 4):
+            EmailOutbox.objects.filter(pk=bad.pk).update(next_attempt_at=now())
+            self.assertEqual(deliver_queued_emails(), (0, 1))
+            bad.refresh_from_db()
+            self.assertEqual(bad.attempts, attempt)
+        self.assertEqual(bad.status, EmailOutbox.FAILED)
+        EmailOutbox.objects.filter(pk=bad.pk).update(next_attempt_at=now())
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+
+
+class OTPTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        self.other = User.objects.create_user(
+            first_name="bola", last_name="ade", email="bola@example.com", password="secret123", role=User.CUSTOMER
+        )
+
+    def verify(self, email, otp):
+        return APIClient().post("/api/auth/verify_acount/", {"email": email, "otp": otp}, format="json")
+
+    def test_override_settings_switches_the_store(self):
+        with override_settings(OTP_STORE="authentication.otp.CacheOTPStore"):
+            self.assertIsInstance(get_otp_store(), CacheOTPStore)
+        self.assertNotIsInstance(get_otp_store(), CacheOTPStore)
+
+    @override_settings(OTP_STORE="authentication.otp.CacheOTPStore")
+    def test_cache_store(self):
+        store = get_otp_store()
+        code = store.issue(self.user)
+        self.assertEqual(store.verify("ada@example.com", code), (VALID, self.user))
+        self.assertEqual(store.verify("bola@example.com", code), (INVALID, None))
+        store.discard(self.user)
+        self.assertEqual(store.verify("ada@example.com", code), (INVALID, None))
+
+    def test_verify_needs_the_email_the_code_was_sent_to(self):
+        code = get_otp_store().issue(self.user)
+        self.assertEqual(self.verify("", code).status_code, 400)
+        self.assertEqual(self.verify("bola@example.com", code).status_code, 404)
+        self.assertEqual(self.verify("ada@example.com", code).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.other.refresh_from_db()
+        self.assertFalse(self.other.is_active)
+
+    def test_expired_code_is_rejected_and_cleared(self):
+        code = get_otp_store().issue(self.user)
+        EmailOTP.objects.filter(user=self.user).update(created_at=now() - OTP_LIFETIME - timedelta(seconds=1))
+        self.assertEqual(get_otp_store().verify("ada@example.com", code)[0], EXPIRED)
+        self.assertEqual(self.verify("ada@example.com", code).status_code, 400)
+
+        call_command("clear_expired_otps", stdout=StringIO())
+        self.assertFalse(EmailOTP.objects.filter(user=self.user).exists())
+        self.assertTrue(EmailOTP.objects.filter(user=self.other).exists())
+
+
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = mock.Mock(return_value=1000.0)
+        patches = [
+            mock.patch.object(TokenBucketThrottle, "timer", self.clock),
+            mock.patch.object(TokenBucketThrottle, "THROTTLE_RATES", {"login": "3/min"}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def login(self, email="ada@example.com"):
+        return APIClient().post("/api/auth/login/", {"email": email, "password": "wrong-password"}, format="json")
+
+    def test_throttled_login_runs_no_query_and_no_hash(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 401)
+        with self.assertNumQueries(0), mock.patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.encode") as encode, \
+                mock.patch("django.contrib.auth.hashers.Argon2PasswordHasher.encode") as argon2_encode:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        encode.assert_not_called()
+        argon2_encode.assert_not_called()
+
+    def test_bucket_refills_gradually_instead_of_per_window(self):
+        self.clock.return_value = 1059.0
+        for _ in range(3):
+            self.assertNotEqual(self.login().status_code, 429)
+        self.assertEqual(self.login().status_code, 429)
+        # a fixed one-minute window would reset at 1080 and allow another 3; the bucket has refilled one token
+        self.clock.return_value = 1081.0
+        self.assertNotEqual(self.login().status_code, 429)
+        self.assertEqual(self.login().status_code, 429)
+        self.clock.return_value = 1101.0
+        self.assertNotEqual(self.login().status_code, 429)
+
+    def test_concurrent_requests_never_spend_the_same_token(self):
+        view = mock.Mock(throttle_scope="login")
+        request = mock.Mock(META={"REMOTE_ADDR": "10.0.0.1"})
+        barrier = threading.Barrier(20)
+        results = []
+
+        def attempt():
+            throttle = TokenBucketThrottle()
+            barrier.wait()
+            results.append(throttle.allow_request(request, view))
+
+        def slow_get(cache_backend, *args, **kwargs):
+            # A network round trip, so the threads really interleave between reading and writing the bucket.
+            value = get(cache_backend, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        get = LocMemCache.get
+        threads = [threading.Thread(target=attempt) for _ in range(20)]
+        with mock.patch.object(LocMemCache, "get", slow_get):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(True), 3)
+
+    def test_email_bucket_is_shared_across_addresses(self):
+        for address in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            APIClient(REMOTE_ADDR=address).post("/api/auth/login/", {"email": "ada@example.com", "password": "x"}, format="json")
+        response = APIClient(REMOTE_ADDR="10.0.0.4").post(
+            "/api/auth/login/", {"email": "ADA@example.com", "password": "x"}, format="json"
+        )
+        self.assertEqual(response.status_code, 429)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+
+    def use_old_hash(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("secret123", hasher="pbkdf2_sha1"))
+
+    def stored_algorithm(self):
+        self.user.refresh_from_db()
+        return self.user.password.split("$", 1)[0]
+
+    def test_only_one_argon2_hasher_is_configured(self):
+        algorithms = [hasher.algorithm for hasher in get_hashers()]
+        self.assertEqual(algorithms.count("argon2"), 1)
+
+    def test_login_upgrades_an_old_hash(self):
+        self.use_old_hash()
+        response = self.client.post("/api/auth/login/", {"email": "ada@example.com", "password": "secret123"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_algorithm(), get_hasher("default").algorithm)
+
+    async def test_async_login_upgrades_an_old_hash(self):
+        await sync_to_async(self.use_old_hash)()
+        response = await self.async_client.post(
+            "/api/auth/login/async/", {"email": "ada@example.com", "password": "secret123"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["data"]), {"email", "id", "full_name", "access_token", "refresh_token"})
+        self.assertEqual(await sync_to_async(self.stored_algorithm)(), get_hasher("default").algorithm)
+
+    async def test_async_login_rejects_bad_credentials(self):
+        for email, password in [("ada@example.com", "wrong"), ("nobody@example.com", "secret123")]:
+            response = await self.async_client.post(
+                "/api/auth/login/async/", {"email": email, "password": password}, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post(
+            "/api/auth/login/async/", {"email": "not-an-email"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch.object(TokenBucketThrottle, "THROTTLE_RATES", {"login": "2/min"})
+    async def test_async_login_is_throttled_like_the_sync_one(self):
+        for _ in range(2):
+            await self.async_client.post(
+                "/api/auth/login/async/", {"email": "ada@example.com", "password": "wrong"}, content_type="application/json"
+            )
+        response = await self.async_client.post(
+            "/api/auth/login/async/", {"email": "ada@example.com", "password": "wrong"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Request was throttled", response.json()["detail"])
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.user.refresh_from_db()
+
+    def wishlist(self, access_token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/customer/wishlist/")
+        user_queries = [query["sql"] for query in queries if User._meta.db_table in query["sql"]]
+        return response, user_queries
+
+    def test_claims_token_needs_no_user_query(self):
+        response, user_queries = self.wishlist(self.user.token()["access"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_queries, [])
+
+    def test_token_without_claims_falls_back_to_loading_the_user(self):
+        response, user_queries = self.wishlist(str(AccessToken.for_user(self.user)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+
+    def test_inactive_claim_is_rejected(self):
+        self.user.is_active = False
+        response, _ = self.wishlist(self.user.token()["access"])
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_waits_for_the_access_token_to_expire(self):
+        access_token = self.user.token()["access"]
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # documented trade-off: the claims still say active until the token expires
+        response, _ = self.wishlist(access_token)
+        self.assertEqual(response.status_code, 200)
+
+
+@mock.patch.object(BlacklistFilter, "start_build", lambda self: self.build())
+class RefreshTokenTests(TestCase):
+    def setUp(self):
+        blacklist_filter.reset()
+        self.addCleanup(blacklist_filter.reset)
+        self.user = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.user.refresh_from_db()
+        self.client = APIClient()
+
+    def refresh(self, refresh_token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/auth/token/refresh/", {"refresh": refresh_token}, format="json")
+        blacklist_queries = [query["sql"] for query in queries if BlacklistedToken._meta.db_table in query["sql"]]
+        return response, blacklist_queries
+
+    def logout(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.post("/api/auth/logout/", {"refresh": tokens["refresh"]}, format="json")
+        self.client.credentials()
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh_returns_an_access_token_with_current_claims(self):
+        tokens = self.user.token()
+        User.objects.filter(pk=self.user.pk).update(role=User.VENDOR)
+        response, _ = self.refresh(tokens["refresh"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data["data"]["access"])["role"], User.VENDOR)
+
+    def test_blacklisted_token_is_rejected(self):
+        blacklist_filter.might_contain("warm-up")
+        tokens = self.user.token()
+        self.logout(tokens)
+        response, _ = self.refresh(tokens["refresh"])
+        self.assertEqual(response.status_code, 401)
+
+    def test_filter_miss_skips_the_blacklist_query(self):
+        self.logout(self.user.token())
+        blacklist_filter.might_contain("warm-up")
+        response, blacklist_queries = self.refresh(self.user.token()["refresh"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(blacklist_queries, [])
+
+    def test_first_check_asks_the_database_while_the_filter_builds(self):
+        with mock.patch.object(BlacklistFilter, "start_build") as start_build:
+            self.assertTrue(blacklist_filter.might_contain("anything"))
+        start_build.assert_called_once_with()
+        self.assertIsNone(blacklist_filter.filter)
+
+    def test_filter_is_rebuilt_after_pruning(self):
+        self.logout(self.user.token())
+        refresh_jti = BlacklistedToken.objects.get().token.jti
+        blacklist_filter.build()
+        self.assertTrue(blacklist_filter.might_contain(refresh_jti))
+
+        BlacklistedToken.objects.all().delete()
+        blacklist_filter.refreshed_at = 0.0
+        blacklist_filter.top_up()
+        self.assertFalse(blacklist_filter.might_contain(refresh_jti))
+
+    def test_row_committed_below_the_last_seen_id_is_picked_up(self):
+        oldest, first, second = (
+            OutstandingToken.objects.get(jti=FilteredRefreshToken.for_user(self.user)["jti"]) for _ in range(3)
+        )
+        BlacklistedToken.objects.create(id=1, token=oldest)
+        BlacklistedToken.objects.create(id=10, token=second)
+        blacklist_filter.build()
+        self.assertEqual(blacklist_filter.last_id, 10)
+
+        # Its id was handed out before 10's, but its transaction committed after the filter read 10.
+        BlacklistedToken.objects.create(id=5, token=first)
+        blacklist_filter.refreshed_at = 0.0
+        self.assertTrue(blacklist_filter.might_contain(first.jti))
+        response, _ = self.refresh(first.token)
+        self.assertEqual(response.status_code, 401)
+
+    def test_inactive_user_cannot_refresh(self):
+        tokens = self.user.token()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response, _ = self.refresh(tokens["refresh"])
+        self.assertEqual(response.status_code, 401)
+
+
+class ImportUsersTests(TestCase):
+    def import_users(self, *rows, **options):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as csv_file:
+            csv_file.write("email,first_name,last_name,password\n")
+            csv_file.writelines(f"{row}\n" for row in rows)
+        self.addCleanup(os.remove, csv_file.name)
+        out = StringIO()
+        call_command("import_users", csv_file.name, stdout=out, **options)
+        return out.getvalue()
+
+    def test_creates_users_with_profiles_and_queues_otps_in_bulk(self):
+        with CaptureQueriesContext(connection) as queries:
+            output = self.import_users("ada@example.com,ada,obi,secret123", "bola@example.com,bola,ade,", send_otp=True)
+        inserts = [query["sql"].split('"')[1] for query in queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(inserts, [
+            User._meta.db_table, Userprofile._meta.db_table, EmailOTP._meta.db_table, EmailOutbox._meta.db_table,
+        ])
+        self.assertIn("Imported 2 user(s), skipped 0", output)
+        users = User.objects.order_by("email")
+        self.assertEqual([user.first_name for user in users], ["Ada", "Bola"])
+        self.assertTrue(users[0].check_password("secret123"))
+        self.assertFalse(users[1].has_usable_password())
+        self.assertEqual(Userprofile.objects.filter(user__in=users).count(), 2)
+        self.assertEqual(EmailOTP.objects.filter(user__in=users).count(), 2)
+        self.assertEqual(
+            sorted(recipient for row in EmailOutbox.objects.all() for recipient in row.recipients),
+            ["ada@example.com", "bola@example.com"],
+        )
+
+    def test_issues_no_otps_unless_asked(self):
+        self.import_users("ada@example.com,ada,obi,secret123")
+        self.assertFalse(User.objects.get(email="ada@example.com").is_active)
+        self.assertFalse(EmailOTP.objects.exists())
+        self.assertFalse(EmailOutbox.objects.exists())
+
+        # The code is issued when the user asks for it.
+        response = APIClient().post("/api/auth/request_otp/", {"email": "ada@example.com"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(EmailOTP.objects.filter(user__email="ada@example.com").exists())
+
+    def test_skips_existing_and_repeated_emails(self):
+        User.objects.create_user(first_name="ada", last_name="obi", email="ada@example.com", password="secret123")
+        output = self.import_users(
+            "ada@example.com,ada,obi,x", "bola@example.com,bola,ade,x", "bola@example.com,bola,ade,y"
+        )
+        self.assertIn("Imported 1 user(s), skipped 2", output)
+        self.assertEqual(User.objects.filter(email="bola@example.com").count(), 1)
+
+    def test_active_import_queues_no_otps(self):
+        self.import_users("ada@example.com,ada,obi,secret123", active=True, send_otp=True)
+        self.assertTrue(User.objects.get(email="ada@example.com").is_active)
+        self.assertFalse(EmailOTP.objects.exists())
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_signup_racing_the_import_only_skips_that_email(self):
+        create_users = ImportUsersCommand.create_users
+
+        def signup_first(command, users, options):
+            if not User.objects.filter(email="ada@example.com").exists():
+                User.objects.create_user(first_name="ada", last_name="obi", email="ada@example.com", password="other")
+            return create_users(command, users, options)
+
+        with mock.patch.object(ImportUsersCommand, "create_users", signup_first):
+            output = self.import_users("ada@example.com,ada,obi,secret123", "bola@example.com,bola,ade,x")
+        self.assertIn("Imported 1 user(s), skipped 1", output)
+        self.assertTrue(User.objects.get(email="ada@example.com").check_password("other"))
+        self.assertTrue(Userprofile.objects.filter(user__email="bola@example.com").exists())
@@ -0,0 +1,94 @@
+import hashlib
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import ScopedRateThrottle
+
+
+
+class TokenBucketThrottle(ScopedRateThrottle):
+    """
+    Token bucket kept in the shared cache and sized by DEFAULT_THROTTLE_RATES[view.throttle_scope]:
+    "5/min" is a bucket of 5 tokens (the burst allowed) that refills continuously at 5 tokens per minute.
+    The bucket is two cache keys: an integer token count, only ever changed with atomic incr/decr,
+    and the time it was last refilled. Taking a token is a decr that lets the request through only if the
+    count stays >= 0, so racing requests can never spend the same token. Earned tokens are credited by
+    whichever request wins a cache.add() claim on the refill time, so they are credited once.
+    Both keys expire after a full period without requests, when the bucket would be full again anyway.
+    Buckets are keyed on the client address; subclasses change `ident_name` and `get_ident_value`.
+    """
+    ident_name = "ip"
+
+    def get_ident_value(self, request):
+        """What the bucket is keyed on; None lets the request through unthrottled"""
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        ident = self.get_ident_value(request)
+        if ident is None:
+            return True
+
+        self.key = self.cache_format % {"scope": f"{self.scope}_{self.ident_name}", "ident": ident}
+        tokens_key, refilled_key = f"{self.key}:tokens", f"{self.key}:refilled_at"
+        self.now = self.timer()
+        refill_rate = self.num_requests / self.duration
+
+        self.cache.add(tokens_key, self.num_requests, self.duration)
+        self.cache.add(refilled_key, self.now, self.duration)
+        refilled_at = self.cache.get(refilled_key, self.now)
+        earned = int((self.now - refilled_at) * refill_rate)
+        if earned and self.cache.add(f"{refilled_key}:{refilled_at!r}", 1, self.duration):
+            refilled_at += earned / refill_rate
+            self.cache.set(refilled_key, refilled_at, self.duration)
+            tokens = self.incr(tokens_key, earned)
+            if tokens > self.num_requests:
+                # The bucket is capped at its size; requests taking tokens meanwhile only lower the count further.
+                self.incr(tokens_key, self.num_requests - tokens)
+
+        if self.incr(tokens_key, -1) < 0:
+            # Give the token back so refused requests don't push the bucket into debt.
+            self.incr(tokens_key, 1)
+            self.wait_seconds = max(0.0, refilled_at + 1 / refill_rate - self.now)
+            return False
+        self.cache.touch(tokens_key, self.duration)
+        return True
+
+    def incr(self, key, delta):
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # The bucket expired since add(): it was full, so start a new one with this change applied.
+            self.cache.add(key, self.num_requests + delta, self.duration)
+            return self.num_requests + delta
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Limits attempts from one client address"""
+
+
+class EmailTokenBucketThrottle(TokenBucketThrottle):
+    """Limits attempts against one account no matter how many addresses they come from"""
+    ident_name = "email"
+
+    def get_ident_value(self, request):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+def check_throttles(request, view):
+    """APIView.check_throttles for views that aren't APIViews (AsyncLoginView): raises Throttled with the longest wait"""
+    durations = [
+        throttle.wait() for throttle in (throttle_class() for throttle_class in view.throttle_classes)
+        if not throttle.allow_request(request, view)
+    ]
+    if durations:
+        raise Throttled(max((duration for duration in durations if duration is not None), default=None))
@@ -1,11 +1,143 @@
-from django.core.mail import send_mail
+import random
+from datetime import timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils.timezone import now
+from .models import EmailOutbox, Userprofile
 
 
 
+def queue_email(subject, message, from_email, recipient_list):
+    """
+    Store an email in the outbox instead of talking to the mail server in the request.
+    The row commits (or rolls back) with the caller's transaction; `process_email_outbox` delivers it.
+    """
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+OTP_EMAIL_SUBJECT = "Your OTP Code"
+OTP_EMAIL_MESSAGE = "Your OTP code is {otp_code}. It will expire in 5 minutes."
+
+
 def send_otp(email, otp_code):
-    subject = "Your OTP Code"
-    message = f"Your OTP code is {otp_code}. It will expire in 5 minutes."
+    subject = OTP_EMAIL_SUBJECT
+    message = OTP_EMAIL_MESSAGE.format(otp_code=otp_code)
     sender_email = settings.EMAIL_HOST_USER
     
-    send_mail(subject, message, sender_email, [email])
\ No newline at end of file
+    queue_email(subject, message, sender_email, [email])
+
+
+def send_otps(codes):
+    """Queue the OTP emails for many users with one bulk insert; `codes` maps email to code"""
+    EmailOutbox.objects.bulk_create(
+        [
+            EmailOutbox(
+                subject=OTP_EMAIL_SUBJECT,
+                body=OTP_EMAIL_MESSAGE.format(otp_code=otp_code),
+                from_email=settings.EMAIL_HOST_USER,
+                recipients=[email],
+            )
+            for email, otp_code in codes.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with a little jitter, capped at an hour"""
+    delay = min(settings.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), 60 * 60)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_queued_emails(batch_size):
+    """
+    Lease up to `batch_size` due emails to this worker in a short transaction: their next_attempt_at moves
+    EMAIL_OUTBOX_LEASE_SECONDS ahead, so other workers skip them while they are being sent,
+    and a worker that dies mid-batch only delays them until the lease runs out.
+    """
+    with transaction.atomic():
+        # SKIP LOCKED lets several workers claim at the same time without picking the same rows.
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.PENDING, next_attempt_at__lte=now())
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now() + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+            )
+    return batch
+
+
+def deliver_queued_emails(batch_size=50, connection=None):
+    """
+    Send up to `batch_size` due emails from the outbox. Failures are retried with backoff
+    until EMAIL_OUTBOX_MAX_ATTEMPTS, then marked failed.
+    Pass a long-lived mail `connection` to share one SMTP session (and TLS handshake) across batches.
+    Returns the number of emails sent and failed.
+    """
+    batch = claim_queued_emails(batch_size)
+    if not batch:
+        return 0, 0
+
+    # No transaction or row lock is held while talking to the mail server.
+    owns_connection = connection is None
+    connection = connection or get_connection()
+    sent = failed = 0
+    for email in batch:
+        message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+        try:
+            # open() is a no-op while the session is up and reconnects after a failure closed it.
+            connection.open()
+            connection.send_messages([message])
+            email.status = EmailOutbox.SENT
+            email.sent_at = now()
+            sent += 1
+        except Exception as e:
+            connection.close()
+            email.attempts += 1
+            email.last_error = str(e)
+            if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                email.status = EmailOutbox.FAILED
+            else:
+                email.next_attempt_at = now() + retry_delay(email.attempts)
+            failed += 1
+    if owns_connection:
+        connection.close()
+    EmailOutbox.objects.bulk_update(batch, ["status", "sent_at", "attempts", "last_error", "next_attempt_at"])
+    return sent, failed
+
+
+def profile_cache_key(user_id):
+    return f"profile:{user_id}"
+
+
+def get_profile(user):
+    """The user's profile with the user row joined in (one query), created on first access"""
+    profile = Userprofile.objects.select_related("user").filter(user_id=user.pk).first()
+    if profile is None:
+        profile, _ = Userprofile.objects.select_related("user").get_or_create(user_id=user.pk)
+    return profile
+
+
+def get_profile_data(user, serializer_class):
+    """The user's serialized profile, served from the cache when possible"""
+    key = profile_cache_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = dict(serializer_class(get_profile(user)).data)
+        cache.set(key, data, settings.PROFILE_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_profile(user_id):
+    """Drop the cached profile once the current transaction commits, so a reader can't re-cache old rows"""
+    key = profile_cache_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -1,17 +1,29 @@
 from django.shortcuts import get_object_or_404
 from rest_framework.generics import GenericAPIView
-from .serializers import CustomerSignUpSerializer, VendorSignUpSerializer, RequestNewOTPSerializer, LoginSerializer, LogoutSerializer, PasswordRestRequestSerializer, PasswordResetSerializer, UserProfilePicSerializer
+from .serializers import CustomerSignUpSerializer, VendorSignUpSerializer, RequestNewOTPSerializer, LoginSerializer, LoginCredentialsSerializer, login_data, LogoutSerializer, RefreshTokenSerializer, PasswordRestRequestSerializer, PasswordResetSerializer, UserProfilePicSerializer
 from django.db import transaction
 from rest_framework.response import Response
 from rest_framework import status
-from .models import User, EmailOTP, Userprofile
+from .models import User
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .utils import send_otp
+from .utils import send_otp, get_profile
+from .otp import get_otp_store, INVALID, EXPIRED
+from .throttling import IPTokenBucketThrottle, EmailTokenBucketThrottle, check_throttles
 from rest_framework import status, permissions, parsers
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils.functional import cached_property
+from django.views import View
+from django.http import JsonResponse
+from django.contrib.auth.hashers import make_password
+from asgiref.sync import sync_to_async
+from rest_framework.request import Request
+from rest_framework.exceptions import ParseError, Throttled
+from .hashers import acheck_password, run_in_hashing_pool
+from .blacklist import FilteredRefreshToken
+from product.images import create_variants, discard_variants
+from product.uploadhandlers import ImageUploadHandler
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 
 
 class CustomerSignUpView(GenericAPIView):
@@ -23,6 +35,8 @@ class CustomerSignUpView(GenericAPIView):
     - If the email exists and the user is active, registration is blocked.
     """
     serializer_class = CustomerSignUpSerializer
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "signup"
 
     @swagger_auto_schema(
         operation_summary="Customer Registration",
@@ -83,8 +97,7 @@ class CustomerSignUpView(GenericAPIView):
 
         if existing_user:
             if not existing_user.is_active:
-                otp, _ = EmailOTP.objects.get_or_create(user=existing_user)
-                otp.generate_otp()
+                get_otp_store().issue(existing_user)
                 return Response({"success": True, "message": "User already registered but not active. OTP sent."}, status=status.HTTP_200_OK)
             return Response({"success": False, "error": "User with this email already exists."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -106,6 +119,8 @@ class VendorSignUpView(GenericAPIView):
     - If the email exists and the user is active, registration is blocked.
     """
     serializer_class = VendorSignUpSerializer
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "signup"
     
     @swagger_auto_schema(
         operation_summary="Vendor Registration",
@@ -167,8 +182,7 @@ class VendorSignUpView(GenericAPIView):
 
         if existing_user:
             if not existing_user.is_active:
-                otp, _ = EmailOTP.objects.get_or_create(user=existing_user)
-                otp.generate_otp()
+                get_otp_store().issue(existing_user)
                 return Response({"success": True, "message": "User already registered but not active. OTP sent."}, status=status.HTTP_200_OK)
             return Response({"success": False, "error": "User with this email already exists."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -183,15 +197,18 @@ class VendorSignUpView(GenericAPIView):
 class VerifyAccount(GenericAPIView):
     """
     User Account Verification View:
-    - Verifies a user's account using an OTP.
+    - Verifies a user's account using their email and OTP.
     - If the OTP is valid, the user's account is activated.
     - If the OTP is missing or incorrect, an appropriate error response is returned.
     """
+    
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "otp"
 
     @swagger_auto_schema(
         operation_summary="Verify User Account",
         operation_description="""
-        - Verifies a user's account by checking the provided OTP.
+        - Verifies a user's account by checking the OTP issued to the given email.
         - If the OTP is valid and not expired, the user's account is activated.
         - If the OTP is missing, expired, or incorrect, an appropriate error response is returned.
         - If the account is already active, an error response is returned.
@@ -199,12 +216,17 @@ class VerifyAccount(GenericAPIView):
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
+                "email": openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    format=openapi.FORMAT_EMAIL,
+                    description="Email the account was registered with"
+                ),
                 "otp": openapi.Schema(
                     type=openapi.TYPE_STRING,
                     description="One-Time Password (OTP) sent to the user's email"
                 )
             },
-            required=["otp"]
+            required=["email", "otp"]
         ),
         responses={
             200: openapi.Response(
@@ -225,7 +247,7 @@ class VerifyAccount(GenericAPIView):
                         "success": openapi.Schema(type=openapi.TYPE_BOOLEAN),
                         "message": openapi.Schema(
                             type=openapi.TYPE_STRING,
-                            description="Possible messages: 'OTP not provided', 'OTP has expired', or 'Account already active'."
+                            description="Possible messages: 'Email and OTP are required', 'OTP has expired', or 'Account already active'."
                         )
                     }
                 )
@@ -254,21 +276,22 @@ class VerifyAccount(GenericAPIView):
     )
     @transaction.atomic
     def post(self, request):
+        email = request.data.get('email')
         otp_code = request.data.get('otp')
         
-        if not otp_code:
+        if not email or not otp_code:
             return Response (
                 {
                     "success": False,
-                    "message": "OTP not Provided"
+                    "message": "Email and OTP are required"
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
             
         try:
-            user_code_obj = EmailOTP.objects.filter(code=otp_code).first()
+            otp_status, user = get_otp_store().verify(User.objects.normalize_email(email), str(otp_code))
             
-            if not user_code_obj:
+            if otp_status == INVALID:
                 return Response(
                     {
                         "success": False,
@@ -277,7 +300,7 @@ class VerifyAccount(GenericAPIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
                 
-            if not user_code_obj.is_valid():
+            if otp_status == EXPIRED:
                 return Response(
                     {
                         "success": False,
@@ -285,11 +308,10 @@ class VerifyAccount(GenericAPIView):
                     },
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            user = user_code_obj.user
             if not user.is_active:
                 user.is_active = True
                 user.save()
-                user_code_obj.delete()
+                get_otp_store().discard(user)
                 return Response(
                     {
                         "success": True,
@@ -321,6 +343,8 @@ class RequestNewOTP(GenericAPIView):
     """
     
     serializer_class = RequestNewOTPSerializer
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "otp"
     
     @swagger_auto_schema(
         operation_summary="Request New OTP",
@@ -407,11 +431,8 @@ class RequestNewOTP(GenericAPIView):
         try:
             user = User.objects.get(email=email)
             
-            EmailOTP.objects.filter(user=user).delete()
-            
-            otp = EmailOTP.objects.create(user=user)
-            otp.generate_otp()
-            send_otp(user.email, otp.code)
+            code = get_otp_store().issue(user)
+            send_otp(user.email, code)
             return Response (
                 {
                     "success": True,
@@ -437,6 +458,8 @@ class LoginView(GenericAPIView):
     """
     
     serializer_class = LoginSerializer
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "login"
     
     @swagger_auto_schema(
         operation_summary="User Login",
@@ -535,6 +558,116 @@ class LoginView(GenericAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AsyncLoginView(View):
+    
+    """
+    Login for ASGI deployments, with the same request and response as LoginView.
+    Password checks run on the bounded hashing pool, so the event loop keeps serving
+    other requests while PBKDF2/Argon2 runs. Outdated hashes are upgraded on success.
+    """
+    
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "login"
+    
+    async def post(self, request):
+        drf_request = Request(request, parsers=[parsers.JSONParser()])
+        try:
+            drf_request.data
+        except ParseError as e:
+            return JsonResponse({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            await sync_to_async(check_throttles)(drf_request, self)
+        except Throttled as e:
+            return JsonResponse({"detail": e.detail}, status=e.status_code)
+        
+        serializer = LoginCredentialsSerializer(data=drf_request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data["email"]
+        password = serializer.validated_data["password"]
+        
+        user = await User.objects.filter(email=email).afirst()
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords.
+            await run_in_hashing_pool(make_password, password)
+            return JsonResponse({"detail": "Invalid Credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+        if not await acheck_password(user, password):
+            return JsonResponse({"detail": "Invalid Credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+        if not user.is_active:
+            return JsonResponse({"detail": "Account not active"}, status=status.HTTP_401_UNAUTHORIZED)
+        
+        return JsonResponse(
+            {
+                "success": True,
+                "message": "Login Successfull",
+                "data": await sync_to_async(login_data)(user, email)
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class RefreshTokenView(GenericAPIView):
+    
+    """
+    Issues a new access token for a refresh token that hasn't been blacklisted (by logout).
+    """
+    
+    serializer_class = RefreshTokenSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    @swagger_auto_schema(
+        operation_summary="Refresh Access Token",
+        operation_description="""
+        - Returns a new access token for a valid refresh token.
+        - The new token carries the user's current role and status.
+        - Refresh tokens blacklisted by logout, expired ones, and inactive accounts are rejected.
+        """,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "refresh": openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description="Refresh token returned by login"
+                )
+            },
+            required=["refresh"]
+        ),
+        responses={
+            200: openapi.Response(
+                "Token Refreshed",
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "success": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "access": openapi.Schema(type=openapi.TYPE_STRING),
+                            }
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response("Bad Request - Missing Refresh Token"),
+            401: openapi.Response("Unauthorized - Invalid, Expired or Blacklisted Refresh Token"),
+        }
+    )
+    
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            {
+                "success": True,
+                "message": "Token Refreshed",
+                "data": serializer.validated_data
+            },
+            status=status.HTTP_200_OK
+        )
+
+
 class LogoutView(GenericAPIView):
     
     """
@@ -598,7 +731,7 @@ class LogoutView(GenericAPIView):
                     },
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            token = RefreshToken(refresh)
+            token = FilteredRefreshToken(refresh)
             token.blacklist()
             
             return Response(
@@ -626,6 +759,8 @@ class PasswordResetRequestView(GenericAPIView):
     """
     
     serializer_class = PasswordRestRequestSerializer
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = "password_reset"
     
     @swagger_auto_schema(
         operation_summary="Request Password Reset",
@@ -746,11 +881,15 @@ class UploadProfilePicView(GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [parsers.MultiPartParser]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Reject oversized or non-image files while they stream in, and spool them to temp files rather than memory.
+        request.upload_handlers = [ImageUploadHandler(request), TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     @cached_property
     def profile(self):
         """Retrieve or create a UserProfile instance for the authenticated user."""
-        user_profile, created = Userprofile.objects.get_or_create(user=self.request.user)
-        return user_profile
+        return get_profile(self.request.user)
 
     @swagger_auto_schema(
         operation_description="Upload a new profile picture (JPG, JPEG, PNG only)",
@@ -768,14 +907,26 @@ class UploadProfilePicView(GenericAPIView):
             400: "Invalid file format or bad request",
         },
     )
-    @transaction.atomic
     def put(self, request, *args, **kwargs):
-        """Handles profile picture upload from OpenAPI."""
+        """
+        Handles profile picture upload from OpenAPI.
+        The variants are rendered and stored before the transaction opens, and deleted again if the save fails.
+        """
         user_profile = self.profile
-        serializer = self.serializer_class(user_profile, data=request.data, partial=True)
+        serializer = self.serializer_class(user_profile, data=request.data, partial=True, context={"request": request})
 
         if serializer.is_valid():
-            serializer.save()
+            new_variants = {}
+            if serializer.validated_data.get("profile_pic"):
+                new_variants["profile_pic_variants"] = create_variants(
+                    [serializer.validated_data["profile_pic"]], f"profiles/{user_profile.user_id}"
+                )[0]
+            try:
+                with transaction.atomic():
+                    serializer.save(**new_variants)
+            except Exception:
+                discard_variants(new_variants.values())
+                raise
             return Response(
                 {
                     "success": True,
@@ -16,6 +16,7 @@ from decouple import config
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import importlib.util
 import os
 
 
@@ -66,8 +67,16 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 2,
     
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.ClaimsJWTAuthentication',
     ),
+    
+    # Token buckets (per IP and per email) for the authentication endpoints, see authentication.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('THROTTLE_RATE_LOGIN', default='10/min'),
+        'signup': config('THROTTLE_RATE_SIGNUP', default='5/min'),
+        'otp': config('THROTTLE_RATE_OTP', default='5/min'),
+        'password_reset': config('THROTTLE_RATE_PASSWORD_RESET', default='5/min'),
+    },
 }
 
 MIDDLEWARE = [
@@ -118,6 +127,17 @@ DATABASES = {
 }
 
 
+# Cache
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when running more than one process.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -137,17 +157,49 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2 (argon2-cffi) is preferred when installed; existing PBKDF2 hashes are upgraded on the next login.
+# TunedArgon2PasswordHasher takes the place of Django's Argon2PasswordHasher: both are named "argon2",
+# so listing the two would leave it to list order which one verifies a hash.
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "authentication.hashers.TunedArgon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+if importlib.util.find_spec("argon2"):
+    PASSWORD_HASHERS.remove("authentication.hashers.TunedArgon2PasswordHasher")
+    PASSWORD_HASHERS.insert(0, "authentication.hashers.TunedArgon2PasswordHasher")
+
+# Argon2id cost (OWASP baseline: 19 MiB, 2 passes, 1 lane)
+ARGON2_TIME_COST = config("ARGON2_TIME_COST", default=2, cast=int)
+ARGON2_MEMORY_COST = config("ARGON2_MEMORY_COST", default=19456, cast=int)
+ARGON2_PARALLELISM = config("ARGON2_PARALLELISM", default=1, cast=int)
+
+# Threads the async login path may use for password hashing
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", default=os.cpu_count() or 1, cast=int)
+
 SITE_URL = ""
 
+# Access tokens carry the user's role and active/staff flags (authentication.authentication.ClaimsJWTAuthentication),
+# so deactivating a user or changing their role only takes effect once their access token expires:
+# ACCESS_TOKEN_LIFETIME_MINUTES is the longest a revoked user keeps access.
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
-    'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('ACCESS_TOKEN_LIFETIME_MINUTES', default=24 * 60, cast=int)),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_BLACKLIST_ENABLED": True,
 }
+
+# In-memory Bloom filter of blacklisted refresh tokens (authentication.blacklist): how often each process
+# pulls newly blacklisted JTIs, and how many it sizes for before rebuilding
+TOKEN_BLACKLIST_FILTER_REFRESH_SECONDS = config('TOKEN_BLACKLIST_FILTER_REFRESH_SECONDS', default=5, cast=int)
+TOKEN_BLACKLIST_FILTER_CAPACITY = config('TOKEN_BLACKLIST_FILTER_CAPACITY', default=100000, cast=int)
+# Ids below the highest one seen that every top-up re-reads, for blacklist rows that committed out of id order
+TOKEN_BLACKLIST_FILTER_OVERLAP_ROWS = config('TOKEN_BLACKLIST_FILTER_OVERLAP_ROWS', default=1000, cast=int)
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         "Auth Token eg [Bearer (JWT) ]": {
@@ -193,6 +245,15 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool)
 EMAIL_USE_SSL = config('EMAIL_USE_SSL', cast=bool)
 DEFAULT_FROM_EMAIL = 'Product Store'
 
+# Outbox worker (manage.py process_email_outbox): retries back off from EMAIL_OUTBOX_BACKOFF_SECONDS
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_BACKOFF_SECONDS = config('EMAIL_OUTBOX_BACKOFF_SECONDS', default=30, cast=int)
+# How long a claimed batch is hidden from other workers while it is being sent; it is retried after that if the worker dies
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', default=5 * 60, cast=int)
+
+# Where signup OTPs live: authentication.otp.DatabaseOTPStore (EmailOTP rows) or authentication.otp.CacheOTPStore
+OTP_STORE = config('OTP_STORE', default='authentication.otp.DatabaseOTPStore')
+
 
 CLOUDINARY_STORAGE = {
     "CLOUD_NAME": config("CLOUDINARY_CLOUD_NAME"),
@@ -200,4 +261,56 @@ CLOUDINARY_STORAGE = {
     "API_SECRET": config("CLOUDINARY_API_SECRET")
 }
 
-DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
\ No newline at end of file
+DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Resized copies of product and profile images (product.images), on Cloudinary like the originals.
+    # Any Django storage backend works as long as its url() is reachable; nothing here serves MEDIA_URL.
+    "image_variants": {
+        "BACKEND": config("IMAGE_VARIANT_STORAGE", default="product.storage.CloudinaryVariantStorage"),
+    },
+}
+
+# Processes that render image variants (needs Pillow; without it only the originals are served)
+IMAGE_VARIANT_WORKERS = config("IMAGE_VARIANT_WORKERS", default=min(os.cpu_count() or 1, 4), cast=int)
+
+# Limits enforced by product.uploadhandlers.ImageUploadHandler while product/profile images stream in
+MAX_IMAGE_UPLOAD_SIZE = config("MAX_IMAGE_UPLOAD_SIZE", default=5 * 1024 * 1024, cast=int)
+MAX_IMAGE_UPLOAD_REQUEST_SIZE = config("MAX_IMAGE_UPLOAD_REQUEST_SIZE", default=26 * 1024 * 1024, cast=int)
+
+# Concurrent Cloudinary uploads across the process (vendor product image uploads)
+PRODUCT_IMAGE_UPLOAD_WORKERS = config("PRODUCT_IMAGE_UPLOAD_WORKERS", default=4, cast=int)
+
+# Number of stock rows a product is split into while it is in flash-sale mode
+FLASH_SALE_STOCK_SHARDS = config("FLASH_SALE_STOCK_SHARDS", default=8, cast=int)
+
+# How long a customer's cached cart item count and total are kept
+CART_SUMMARY_CACHE_TIMEOUT = config("CART_SUMMARY_CACHE_TIMEOUT", default=60 * 60, cast=int)
+
+# How long a serialized product is kept (vendor.cache); keys carry modified_at, so edits never serve stale data
+PRODUCT_FRAGMENT_CACHE_TIMEOUT = config("PRODUCT_FRAGMENT_CACHE_TIMEOUT", default=24 * 60 * 60, cast=int)
+
+# Product list pages (ProductView) are cached whole: fresh for PRODUCT_LIST_CACHE_TIMEOUT seconds, then served
+# stale for up to PRODUCT_LIST_STALE_TIMEOUT more while a single request rebuilds them (vendor.cache.single_flight)
+PRODUCT_LIST_CACHE_TIMEOUT = config("PRODUCT_LIST_CACHE_TIMEOUT", default=30, cast=int)
+PRODUCT_LIST_STALE_TIMEOUT = config("PRODUCT_LIST_STALE_TIMEOUT", default=5 * 60, cast=int)
+SINGLE_FLIGHT_WAIT_SECONDS = config("SINGLE_FLIGHT_WAIT_SECONDS", default=5, cast=float)
+# The single-flight lock is a cache key too, so it is only shared between processes with a shared CACHE_BACKEND
+SINGLE_FLIGHT_LOCK_TIMEOUT = config("SINGLE_FLIGHT_LOCK_TIMEOUT", default=30, cast=int)
+
+# Most products one GET /api/products/batch/ request may ask for
+PRODUCT_BATCH_MAX_IDS = config("PRODUCT_BATCH_MAX_IDS", default=100, cast=int)
+
+# Changes feed (GET /api/products/changes/): entries per page, how long a change waits before it is listed
+# (so transactions still in flight can't slip behind a cursor), and how long deletes stay listed (prune_tombstones)
+PRODUCT_CHANGES_PAGE_SIZE = config("PRODUCT_CHANGES_PAGE_SIZE", default=200, cast=int)
+PRODUCT_CHANGES_SETTLE_SECONDS = config("PRODUCT_CHANGES_SETTLE_SECONDS", default=5, cast=int)
+PRODUCT_TOMBSTONE_RETENTION_DAYS = config("PRODUCT_TOMBSTONE_RETENTION_DAYS", default=30, cast=int)
+
+# How long a product/category slug -> id mapping is cached (vendor.cache.get_by_slug checks it on every hit)
+SLUG_CACHE_TIMEOUT = config("SLUG_CACHE_TIMEOUT", default=24 * 60 * 60, cast=int)
+
+# How long a user's serialized vendor/customer profile is cached (dropped whenever the user or profile changes)
+PROFILE_CACHE_TIMEOUT = config("PROFILE_CACHE_TIMEOUT", default=60 * 60, cast=int)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import WishList
+from .models import WishList, PriceSnapshot
 
 class WishListAdmin(admin.ModelAdmin):
     list_display = ('full_name', 'product')
@@ -13,3 +13,4 @@ class WishListAdmin(admin.ModelAdmin):
 
 
 admin.site.register(WishList, WishListAdmin)
+admin.site.register(PriceSnapshot)
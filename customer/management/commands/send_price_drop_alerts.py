@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from customer.utils import send_price_drop_alerts
+
+
+class Command(BaseCommand):
+    help = "Email customers a digest of wishlisted products whose price dropped since the last run (run from cron)"
+
+    def handle(self, *args, **options):
+        sent = send_price_drop_alerts()
+        self.stdout.write(f"Sent {sent} price-drop digest(s)")
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0001_initial"),
+        ("product", "0004_product_flash_sale_productstockshard"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wishlist",
+            index=models.Index(
+                fields=["customer", "-created_at", "-id"],
+                name="customer_wi_custome_9882cd_idx",
+            ),
+        ),
+    ]
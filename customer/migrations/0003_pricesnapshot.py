@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0002_wishlist_customer_wi_custome_9882cd_idx"),
+        ("product", "0004_product_flash_sale_productstockshard"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceSnapshot",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="price_snapshot",
+                        serialize=False,
+                        to="product.product",
+                    ),
+                ),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+    ]
@@ -12,6 +12,19 @@ class WishList(models.Model):
     
     class Meta:
         unique_together = ('customer', 'product')
+        indexes = [
+            models.Index(fields=['customer', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.customer.email} - {self.product.name}"
+
+
+
+class PriceSnapshot(models.Model):
+    """Last price the price-drop job saw for a wishlisted product"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="price_snapshot")
+    price = models.DecimalField(decimal_places=2, max_digits=10)
+    
+    def __str__(self):
+        return f"{self.product_id} @ {self.price}"
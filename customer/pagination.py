@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+
+class WishListCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'Links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+            },
+            'results': data,
+        })
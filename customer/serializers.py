@@ -28,13 +28,16 @@ class CustomerProfileSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         user_data = validated_data.pop("user", {})
         
-        for attr, value in user_data.items():
-            setattr(instance.user, attr, value)
-        instance.user.save()
+        # Only write the columns that were sent (plus the auto_now timestamp).
+        if user_data:
+            for attr, value in user_data.items():
+                setattr(instance.user, attr, value)
+            instance.user.save(update_fields=[*user_data, "modified_at"])
     
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        if validated_data:
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save(update_fields=[*validated_data, "modified_at"])
 
         return instance
 
@@ -47,4 +50,18 @@ class WishListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = WishList
-        fields = ["id", "product", "product_name", "product_price", "created_at"]
\ No newline at end of file
+        fields = ["id", "product", "product_name", "product_price", "created_at"]
+
+
+class WishListProductSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+
+
+class WishListBulkSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=100)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=100)
+    
+    def validate(self, data):
+        if not data["add"] and not data["remove"]:
+            raise serializers.ValidationError("Provide product IDs to add or remove.")
+        return data
@@ -1,3 +1,130 @@
+from django.core import mail
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from authentication.models import User
+from product.models import Product
+from .models import WishList
+from .utils import add_to_wishlist, send_price_drop_alerts
 
-# Create your tests here.
+
+class WishlistTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(
+            first_name="chi", last_name="eze", email="chi@example.com", password="secret123", role=User.VENDOR
+        )
+        self.customer = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def create_products(self, count):
+        return [
+            Product.objects.create(vendor=self.vendor, name=f"lamp {index}", slug=f"lamp-{index}", price=10 + index, stock=3)
+            for index in range(count)
+        ]
+
+
+class WishlistAddRemoveTests(WishlistTestCase):
+    def test_adding_twice_is_not_an_error_and_returns_the_item(self):
+        [product] = self.create_products(1)
+        first = self.client.post("/api/customer/wishlist/", {"product": product.pk}, format="json")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()["data"]["product_name"], "Lamp 0")
+
+        second = self.client.post("/api/customer/wishlist/", {"product": product.pk}, format="json")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()["data"]["id"], first.json()["data"]["id"])
+        self.assertEqual(WishList.objects.filter(customer=self.customer).count(), 1)
+
+    def test_adding_an_unknown_product_is_a_404(self):
+        response = self.client.post("/api/customer/wishlist/", {"product": 999}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_removing_twice_is_not_an_error(self):
+        [product] = self.create_products(1)
+        WishList.objects.create(customer=self.customer, product=product)
+        for _ in range(2):
+            response = self.client.delete("/api/customer/wishlist/", {"product": product.pk}, format="json")
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(WishList.objects.filter(customer=self.customer).exists())
+
+    def test_bulk_adds_and_removes_in_one_request(self):
+        kept, dropped, new = self.create_products(3)
+        WishList.objects.create(customer=self.customer, product=kept)
+        WishList.objects.create(customer=self.customer, product=dropped)
+        response = self.client.post(
+            "/api/customer/wishlist/bulk/", {"add": [kept.pk, new.pk, 999], "remove": [dropped.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], {"added": [new.pk], "removed": 1})
+        self.assertEqual(
+            set(WishList.objects.filter(customer=self.customer).values_list("product_id", flat=True)), {kept.pk, new.pk}
+        )
+
+    def test_bulk_needs_something_to_do(self):
+        response = self.client.post("/api/customer/wishlist/bulk/", {"add": [], "remove": []}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class WishlistPaginationTests(WishlistTestCase):
+    def wishlist(self, count):
+        for product in self.create_products(count):
+            WishList.objects.create(customer=self.customer, product=product)
+
+    def test_query_count_does_not_grow_with_the_wishlist(self):
+        self.wishlist(3)
+        with self.assertNumQueries(1):
+            small = self.client.get("/api/customer/wishlist/", {"page_size": 100})
+        WishList.objects.all().delete()
+        Product.objects.all().delete()
+        self.wishlist(25)
+        with self.assertNumQueries(1):
+            large = self.client.get("/api/customer/wishlist/", {"page_size": 100})
+        self.assertEqual((len(small.json()["results"]), len(large.json()["results"])), (3, 25))
+
+    def test_next_cursor_walks_every_item_once(self):
+        self.wishlist(25)
+        seen = []
+        url, params = "/api/customer/wishlist/", {"page_size": 10}
+        while url:
+            body = self.client.get(url, params).json()
+            seen += [item["product"] for item in body["results"]]
+            url, params = body["Links"]["next"], None
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(
+            seen, list(WishList.objects.order_by("-created_at", "-id").values_list("product_id", flat=True))
+        )
+
+
+class PriceDropAlertTests(WishlistTestCase):
+    def drop_price(self, product, price):
+        product.price = price
+        product.save()
+
+    def test_one_digest_per_customer_and_no_repeats(self):
+        lamp, desk, chair = self.create_products(3)
+        other = User.objects.create_user(
+            first_name="bola", last_name="ade", email="bola@example.com", password="secret123", role=User.CUSTOMER
+        )
+        User.objects.filter(pk__in=[self.customer.pk, other.pk]).update(is_active=True)
+        add_to_wishlist(self.customer, [lamp.pk, desk.pk, chair.pk])
+        add_to_wishlist(other, [desk.pk])
+        # dropped after being wishlisted but before the job ever ran
+        self.drop_price(lamp, 5)
+        self.drop_price(desk, 6)
+        self.drop_price(chair, 50)
+
+        self.assertEqual(send_price_drop_alerts(), 2)
+        digests = {message.to[0]: message.body for message in mail.outbox}
+        self.assertIn("Lamp 0: 10.00 -> 5.00", digests["ada@example.com"])
+        self.assertIn("Lamp 1: 11.00 -> 6.00", digests["ada@example.com"])
+        self.assertNotIn("Lamp 2", digests["ada@example.com"])
+        self.assertIn("Lamp 1", digests["bola@example.com"])
+
+        self.assertEqual(send_price_drop_alerts(), 0)
+        self.drop_price(desk, 4)
+        self.assertEqual(send_price_drop_alerts(), 2)
+        self.assertEqual(len(mail.outbox), 4)
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import CustomerProfileView, WishlistView
+from .views import CustomerProfileView, WishlistView, WishlistBulkView
 
 
 
 urlpatterns = [
     path("profile/", CustomerProfileView.as_view()),
-    path("wishlist/", WishlistView.as_view())
+    path("wishlist/", WishlistView.as_view()),
+    path("wishlist/bulk/", WishlistBulkView.as_view())
 ]
\ No newline at end of file
@@ -0,0 +1,104 @@
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection
+from django.db.models import F
+from django.utils.timezone import now
+from product.models import Product
+from .models import WishList, PriceSnapshot
+
+
+def add_to_wishlist(customer, product_ids):
+    """
+    Save products to the customer's wishlist in a single INSERT ... SELECT.
+    Unknown products and products already saved are skipped, so repeating the call is harmless.
+    Newly added products get a price snapshot, so a drop before the next price-drop run is still alerted.
+    Returns the IDs of the products that were newly added.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return []
+
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    sql = (
+        f"INSERT INTO {WishList._meta.db_table} (customer_id, product_id, created_at) "
+        f"SELECT %s, id, %s FROM {Product._meta.db_table} WHERE id IN ({placeholders}) "
+        "ON CONFLICT (customer_id, product_id) DO NOTHING "
+        "RETURNING product_id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [customer.pk, now(), *product_ids])
+        added = [row[0] for row in cursor.fetchall()]
+    snapshot_prices(added)
+    return added
+
+
+def snapshot_prices(product_ids):
+    """Record the current price of products that don't have a PriceSnapshot yet (one INSERT ... SELECT)"""
+    if not product_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    sql = (
+        f"INSERT INTO {PriceSnapshot._meta.db_table} (product_id, price) "
+        f"SELECT id, price FROM {Product._meta.db_table} WHERE id IN ({placeholders}) "
+        "ON CONFLICT (product_id) DO NOTHING"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, product_ids)
+
+
+def remove_from_wishlist(customer, product_ids):
+    """Delete the customer's wishlist rows for `product_ids` in one statement. Returns the number removed."""
+    deleted, _ = WishList.objects.filter(customer=customer, product_id__in=product_ids).delete()
+    return deleted
+
+
+def send_price_drop_alerts():
+    """
+    Email every customer one digest of the wishlisted products that got cheaper since the last run.
+    Meant to run periodically (see the `send_price_drop_alerts` command), not in a request.
+    Returns the number of digests sent.
+    """
+    # Wishlist rows from before snapshots were taken on add start from the current price.
+    PriceSnapshot.objects.bulk_create(
+        [
+            PriceSnapshot(product_id=product_id, price=price)
+            for product_id, price in Product.objects.filter(wishlists__isnull=False, price_snapshot__isnull=True)
+            .distinct().values_list("id", "price")
+        ],
+        ignore_conflicts=True,
+    )
+
+    changed = list(
+        PriceSnapshot.objects.exclude(price=F("product__price")).values_list("product_id", "price", "product__price")
+    )
+    drops = {product_id: (old, new) for product_id, old, new in changed if new < old}
+
+    rows = (
+        WishList.objects.filter(product_id__in=list(drops), customer__is_active=True)
+        .order_by("customer_id", "product__name")
+        .values_list("customer_id", "customer__email", "customer__first_name", "product_id", "product__name")
+    )
+    messages = []
+    for _, items in groupby(rows, key=itemgetter(0)):
+        items = list(items)
+        email, first_name = items[0][1], items[0][2]
+        lines = [f"- {name}: {drops[product_id][0]} -> {drops[product_id][1]}" for *_, product_id, name in items]
+        messages.append(EmailMessage(
+            "Price drops on your wishlist",
+            f"Hi {first_name},\n\nThese items on your wishlist are now cheaper:\n" + "\n".join(lines),
+            settings.EMAIL_HOST_USER,
+            [email],
+        ))
+
+    sent = 0
+    if messages:
+        with get_connection() as mail_connection:
+            sent = mail_connection.send_messages(messages) or 0
+
+    # Only move the snapshots forward once the digests are out, to the prices the digests were built from.
+    PriceSnapshot.objects.bulk_update(
+        [PriceSnapshot(product_id=product_id, price=new) for product_id, _, new in changed], ["price"], batch_size=500
+    )
+    return sent
@@ -4,14 +4,14 @@ from rest_framework import status, permissions
 from django.db import transaction
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from authentication.models import Userprofile
+from authentication.utils import get_profile, get_profile_data
 from .serializers import CustomerProfileSerializer
 from authentication.permissions import IsCustomer
 from django.utils.functional import cached_property
-from .serializers import WishListSerializer
+from .serializers import WishListSerializer, WishListProductSerializer, WishListBulkSerializer
 from .models import WishList
-from product.models import Product
-from django.shortcuts import get_object_or_404
+from .utils import add_to_wishlist, remove_from_wishlist
+from .pagination import WishListCursorPagination
 from rest_framework.parsers import JSONParser
 
 
@@ -24,9 +24,7 @@ class CustomerProfileView(GenericAPIView):
     
     @cached_property
     def profile(self):
-        user = self.request.user
-        profile, _ = Userprofile.objects.get_or_create(user=user)
-        return profile
+        return get_profile(self.request.user)
 
     @swagger_auto_schema(
         operation_description="Retrieve the authenticated customer's profile details.",
@@ -35,9 +33,8 @@ class CustomerProfileView(GenericAPIView):
 
     
     def get(self, request):
-        serializer = self.serializer_class(self.profile)
         return Response(
-            {"success": True, "message": serializer.data},
+            {"success": True, "message": get_profile_data(request.user, self.serializer_class)},
             status=status.HTTP_200_OK
         )
     
@@ -85,31 +82,34 @@ class WishlistView(GenericAPIView):
     permission_classes = [permissions.IsAuthenticated, IsCustomer]
     queryset = WishList.objects.all()
     parser_classes = [JSONParser]
+    pagination_class = WishListCursorPagination
     
     def get_parser_classes(self):
         if self.request.method == "DELETE":
             return [JSONParser()]
         return super().get_parser_classes()
     
+    def get_queryset(self):
+        """Only load the product columns the serializer shows"""
+        return (
+            WishList.objects.filter(customer=self.request.user)
+            .select_related("product")
+            .only("id", "created_at", "product__id", "product__name", "product__price")
+        )
+    
     @swagger_auto_schema(
-        operation_description="Retrieve the authenticated customer's wishlist.",
+        operation_description="Retrieve the authenticated customer's wishlist, newest first. Use the `cursor` from the `Links` to page.",
         responses={200: WishListSerializer(many=True)}
     )
     
     def get(self, request):
         """Fetch the wishlist of the authenticated customer."""
-        wishlist = WishList.objects.filter(customer=request.user)
-        serializer = self.serializer_class(wishlist, many=True)
-        return Response(
-            {
-                "success": True,
-                "data": serializer.data
-            },
-            status=status.HTTP_200_OK
-        )
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Add a product to the wishlist.",
+        operation_description="Add a product to the wishlist. Adding a product that is already saved is not an error.",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -122,37 +122,43 @@ class WishlistView(GenericAPIView):
                 description="Product added to wishlist",
                 schema=WishListSerializer()
             ),
-            400: openapi.Response(description="Product is already in wishlist or invalid data"),
+            200: openapi.Response(
+                description="Product was already in the wishlist",
+                schema=WishListSerializer()
+            ),
+            400: openapi.Response(description="Invalid data"),
+            404: openapi.Response(description="Product not found"),
         }
     )
     
-    @transaction.atomic
     def post(self, request):
-        product_id = request.data.get("product")
-        product = get_object_or_404(Product, id=product_id)
-        
-        if WishList.objects.filter(customer=request.user, product=product).exists():
+        serializer = WishListProductSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(
-                {
-                    "success": False,
-                    "message": "Product is already in your wishlist."
-                },
+                {"success": False, "message": serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        product_id = serializer.validated_data["product"]
         
-        wishlist_item = WishList.objects.create(customer=request.user, product=product)
-        serializer = self.serializer_class(wishlist_item)
+        added = add_to_wishlist(request.user, [product_id])
+        # Nothing inserted and no row either means the product doesn't exist.
+        wishlist_item = self.get_queryset().filter(product_id=product_id).first()
+        if wishlist_item is None:
+            return Response(
+                {"success": False, "message": "Product not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
         return Response(
             {
                 "success": True,
-                "message": "Product saved to wishlist",
-                "data": serializer.data
+                "message": "Product saved to wishlist" if added else "Product is already in your wishlist.",
+                "data": self.serializer_class(wishlist_item).data
             },
-            status=status.HTTP_201_CREATED
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK
         )
     
     @swagger_auto_schema(
-        operation_description="Remove a product from the wishlist.",
+        operation_description="Remove a product from the wishlist. Removing a product that isn't saved is not an error.",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -162,24 +168,73 @@ class WishlistView(GenericAPIView):
         ),
         responses={
             200: openapi.Response(description="Product removed from wishlist"),
-            400: openapi.Response(description="Product ID is required or not found"),
+            400: openapi.Response(description="Product ID is required"),
         }
     )
     
-    @transaction.atomic
     def delete(self, request):
-        product_id = request.data.get("product")
-        if not product_id:
+        serializer = WishListProductSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(
-                {"success": False, "message": "Product ID is required."},
+                {"success": False, "message": serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        wishlist_item = get_object_or_404(WishList, customer=request.user, product_id=product_id)
-        wishlist_item.delete()
+        removed = remove_from_wishlist(request.user, [serializer.validated_data["product"]])
         return Response(
             {
                 "success": True,
-                "message": "Product removed from wishlist.",
+                "message": "Product removed from wishlist." if removed else "Product is not in your wishlist.",
             },
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+
+
+class WishlistBulkView(GenericAPIView):
+    serializer_class = WishListBulkSerializer
+    permission_classes = [permissions.IsAuthenticated, IsCustomer]
+    parser_classes = [JSONParser]
+    
+    @swagger_auto_schema(
+        operation_description="Add and/or remove several products from the wishlist at once. Removals are applied after additions.",
+        request_body=WishListBulkSerializer,
+        responses={
+            200: openapi.Response(
+                description="Wishlist updated",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "success": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        "message": openapi.Schema(type=openapi.TYPE_STRING),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "added": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_INTEGER)),
+                                "removed": openapi.Schema(type=openapi.TYPE_INTEGER),
+                            }
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(description="Invalid data"),
+        }
+    )
+    
+    @transaction.atomic
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"success": False, "message": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        added = add_to_wishlist(request.user, serializer.validated_data["add"])
+        removed = remove_from_wishlist(request.user, serializer.validated_data["remove"])
+        return Response(
+            {
+                "success": True,
+                "message": "Wishlist updated",
+                "data": {"added": added, "removed": removed}
+            },
+            status=status.HTTP_200_OK
+        )
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage
+from .models import Category, Product, ProductImage, ImageAsset, ProductTombstone
+from .utils import start_flash_sale, reconcile_stock
 
 
 
@@ -15,17 +16,30 @@ class CategoryAdmin(admin.ModelAdmin):
 
 class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug' : ('name',)}
-    list_display = ('name', 'category', 'get_vendor_business_name', 'price', 'slug', 'stock', 'modified_at')
+    list_display = ('name', 'category', 'get_vendor_business_name', 'price', 'slug', 'stock', 'flash_sale', 'modified_at')
     search_fields = ('name', 'category__title', 'vendor__business_name', 'price')
     inlines = [ProductImageInline]
+    actions = ['enable_flash_sale', 'disable_flash_sale']
     
     def get_vendor_business_name(self, obj):
         return obj.vendor.business_name  
     
     get_vendor_business_name.short_description = 'Business Name'
+    
+    def enable_flash_sale(self, request, queryset):
+        for product in queryset:
+            start_flash_sale(product)
+    enable_flash_sale.short_description = 'Start flash sale (shard stock)'
+    
+    def disable_flash_sale(self, request, queryset):
+        for product in queryset.filter(flash_sale=True):
+            reconcile_stock(product, end_sale=True)
+    disable_flash_sale.short_description = 'End flash sale (fold shards into stock)'
 
 
 
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Product, ProductAdmin)
-admin.site.register(ProductImage)
\ No newline at end of file
+admin.site.register(ProductImage)
+admin.site.register(ImageAsset)
+admin.site.register(ProductTombstone)
\ No newline at end of file
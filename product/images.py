@@ -0,0 +1,121 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from uuid import uuid4
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are only served at their original size
+    Image = None
+
+
+logger = logging.getLogger(__name__)
+
+# name -> (bounding box, format); every variant keeps the original aspect ratio
+IMAGE_VARIANTS = {
+    "thumbnail": ((200, 200), "JPEG"),
+    "medium": ((800, 800), "JPEG"),
+    "webp": ((800, 800), "WEBP"),
+}
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+
+
+def render_variants(data):
+    """
+    Resize the encoded image `data` into every IMAGE_VARIANTS entry. Runs in the variant process pool,
+    so it only takes and returns bytes. Returns {name: (bytes, extension)}, or {} if Pillow can't read the image.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            # JPEGs can be decoded straight at a reduced scale, which is most of the cost for large photos.
+            image.draft("RGB", max(size for size, _ in IMAGE_VARIANTS.values()))
+            image = ImageOps.exif_transpose(image)
+            rendered = {}
+            for name, (size, image_format) in IMAGE_VARIANTS.items():
+                variant = image.copy()
+                variant.thumbnail(size)
+                if image_format == "JPEG" and variant.mode not in ("RGB", "L"):
+                    variant = variant.convert("RGB")
+                output = BytesIO()
+                variant.save(output, image_format, quality=82, optimize=True)
+                rendered[name] = (output.getvalue(), EXTENSIONS[image_format])
+            return rendered
+    except (OSError, Image.DecompressionBombError):
+        return {}
+
+
+_variant_pool = None
+
+
+def variant_pool():
+    """Worker processes for resizing; Pillow's encoders hold the GIL, so threads wouldn't help"""
+    global _variant_pool
+    if _variant_pool is None:
+        # spawn rather than fork: the web process already runs threads (hashing, uploads) that fork would copy mid-lock.
+        _variant_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _variant_pool
+
+
+def start_rendering(files):
+    """
+    Submit each uploaded file to the variant process pool and return one future per file (None without Pillow),
+    so the caller can upload the originals while the variants render and pass them on to `create_variants`.
+    """
+    if Image is None:
+        return [None for _ in files]
+
+    futures = []
+    for file in files:
+        file.seek(0)
+        futures.append(variant_pool().submit(render_variants, file.read()))
+        file.seek(0)
+    return futures
+
+
+def create_variants(files, prefix, rendering=None, executor=None):
+    """
+    Wait for the variants of each uploaded file (rendering them now unless `rendering` comes from `start_rendering`)
+    and save them to the "image_variants" storage, through `executor` when given.
+    Returns one {variant name: storage name} per file, in order; empty when Pillow isn't installed or can't read it.
+    """
+    if rendering is None:
+        rendering = start_rendering(files)
+
+    storage = storages["image_variants"]
+    stored, saves = [], []
+    for file, future in zip(files, rendering):
+        rendered = future.result() if future is not None else {}
+        if future is not None and not rendered:
+            logger.warning("Could not render variants for %s", file.name)
+        folder = f"{prefix}/{uuid4().hex}"
+        variants = {}
+        stored.append(variants)
+        saves += [(variants, name, f"{folder}/{name}.{extension}", data) for name, (data, extension) in rendered.items()]
+
+    def save(job):
+        variants, name, path, data = job
+        variants[name] = storage.save(path, ContentFile(data))
+
+    list((executor.map if executor else map)(save, saves))
+    return stored
+
+
+def discard_variants(variant_sets):
+    """Delete the stored files of each {variant name: storage name}, e.g. for images whose row was never saved"""
+    storage = storages["image_variants"]
+    for variants in variant_sets:
+        for name in variants.values():
+            storage.delete(name)
+
+
+def variant_url(variants, name, fallback):
+    """URL of the `name` variant if it was generated, otherwise `fallback` (the original)"""
+    if name and name in (variants or {}):
+        return storages["image_variants"].url(variants[name])
+    return fallback
@@ -0,0 +1,27 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from product.models import ProductTombstone
+
+
+class Command(BaseCommand):
+    help = """
+    Delete ProductTombstone rows older than PRODUCT_TOMBSTONE_RETENTION_DAYS, in batches.
+    The changes feed answers 410 to cursors older than that, so those clients re-download the catalog instead.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = ProductTombstone.objects.filter(
+            deleted_at__lt=now() - timedelta(days=settings.PRODUCT_TOMBSTONE_RETENTION_DAYS)
+        )
+        deleted = 0
+        while True:
+            ids = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            deleted += ProductTombstone.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(f"Deleted {deleted} product tombstone(s)")
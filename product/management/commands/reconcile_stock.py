@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from product.models import Product
+from product.utils import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = "Fold flash-sale stock shards back into Product.stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--end-sale", action="store_true", help="Remove the shards and take the products out of flash-sale mode")
+        parser.add_argument("products", nargs="*", type=int, help="Product IDs (defaults to every flash-sale product)")
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(flash_sale=True).only("id", "name", "flash_sale")
+        if options["products"]:
+            products = products.filter(pk__in=options["products"])
+
+        for product in products:
+            total = reconcile_stock(product, end_sale=options["end_sale"])
+            self.stdout.write(f"{product.name}: stock {total}")
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0006_imageasset_productimage_asset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="primary_image_url",
+            field=models.CharField(blank=True, default="", max_length=500),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="primary_image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="image_url",
+            field=models.CharField(blank=True, default="", max_length=500),
+        ),
+    ]
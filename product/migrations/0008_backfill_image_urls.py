@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:20
+
+from django.db import migrations
+from django.db.models import JSONField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_image_urls(apps, schema_editor):
+    ProductImage = apps.get_model("product", "ProductImage")
+    Product = apps.get_model("product", "Product")
+
+    images = ProductImage.objects.filter(image_url="").exclude(image="").only("id", "image")
+    batch = []
+    for image in images.iterator(chunk_size=1000):
+        image.image_url = image.image.url
+        batch.append(image)
+        if len(batch) == 1000:
+            ProductImage.objects.bulk_update(batch, ["image_url"])
+            batch = []
+    ProductImage.objects.bulk_update(batch, ["image_url"])
+
+    first_image = ProductImage.objects.filter(product=OuterRef("pk")).order_by("pk")
+    Product.objects.filter(images__isnull=False).distinct().update(
+        primary_image_url=Coalesce(Subquery(first_image.values("image_url")[:1]), Value("")),
+        primary_image_variants=Coalesce(
+            Subquery(first_image.values("variants")[:1]), Value({}, output_field=JSONField())
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0007_product_primary_image_url_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_image_urls, migrations.RunPython.noop),
+    ]
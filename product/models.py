@@ -2,6 +2,7 @@ from django.db import models
 from cloudinary.models import CloudinaryField
 from authentication.models import User
 from django.utils.text import slugify
+from django.utils.timezone import now
 
 
 class Category(models.Model):
@@ -32,14 +33,32 @@ class Product(models.Model):
     price = models.DecimalField(decimal_places=2, max_digits=10)
     stock = models.IntegerField()
     discount = models.BooleanField(default=False)
+    flash_sale = models.BooleanField(default=False)
+    # Copied from the first image (product.utils.refresh_primary_images) so lists don't need to load images
+    primary_image_url = models.CharField(max_length=500, blank=True, default="")
+    primary_image_variants = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # the changes feed (product.utils.product_changes) walks products in this order
+            models.Index(fields=["modified_at", "id"], name="product_modified_at_id_idx"),
+        ]
+
     @property
     def in_stock(self):
         return self.stock > 0  
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The price as read, so a save can tell whether it changed (store.signals) without re-reading the row
+        if "price" in field_names:
+            instance._loaded_price = values[field_names.index("price")]
+        return instance
+
     def save(self, *args, **kwargs):
         self.name = self.name.capitalize()
         if not self.slug:
@@ -52,9 +71,52 @@ class Product(models.Model):
         return self.name
 
 
+class ImageAsset(models.Model):
+    """One stored image per distinct content; ProductImages with the same bytes share it instead of re-uploading"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    image = CloudinaryField('product_images')
+    variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
+    # image and variants are copied from the asset, so reads don't need the join
+    asset = models.ForeignKey(ImageAsset, on_delete=models.PROTECT, blank=True, null=True, related_name='product_images')
     image = CloudinaryField('product_images')
+    # Resolved once when the image is stored, instead of building the Cloudinary URL on every response
+    image_url = models.CharField(max_length=500, blank=True, default="")
+    # variant name -> file name in the "image_variants" storage (see product.images)
+    variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"Image for {self.product.name}"
+
+
+class ProductTombstone(models.Model):
+    """Left behind by a deleted product so the changes feed can tell clients to drop it"""
+    product_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "product_id"], name="tombstone_deleted_at_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"Product {self.product_id} deleted at {self.deleted_at}"
+
+
+class ProductStockShard(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    index = models.PositiveSmallIntegerField()
+    stock = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'index')
+
+    def __str__(self):
+        return f"{self.product.name} shard {self.index} ({self.stock})"
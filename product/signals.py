@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+from .images import discard_variants
+from .models import Category, Product, ProductImage, ProductTombstone
+from .utils import refresh_primary_images
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_variants(sender, instance, **kwargs):
+    # Variants of a shared asset belong to the asset, not to this row.
+    if instance.variants and instance.asset_id is None:
+        transaction.on_commit(lambda: discard_variants([instance.variants]))
+
+
+@receiver(post_save, sender=ProductImage)
+def store_image_url(sender, instance, **kwargs):
+    """Images saved one by one (e.g. in the admin) get their URL resolved here; the upload view sets it itself"""
+    # to_python also copes with a plain public id assigned in code
+    image = ProductImage._meta.get_field("image").to_python(instance.image)
+    image_url = image.url if image else ""
+    if instance.image_url != image_url:
+        instance.image_url = image_url
+        ProductImage.objects.filter(pk=instance.pk).update(image_url=image_url)
+    refresh_primary_images([instance.product_id])
+
+
+@receiver(post_delete, sender=ProductImage)
+def refresh_primary_image_after_delete(sender, instance, **kwargs):
+    refresh_primary_images([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_products(sender, instance, **kwargs):
+    """Products embed their category, so their cached fragments (vendor.cache) have to move to a new key"""
+    Product.objects.filter(category=instance).update(modified_at=now())
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    """Deletes (including cascades from a deleted vendor) are otherwise invisible to the changes feed"""
+    ProductTombstone.objects.create(product_id=instance.pk)
@@ -0,0 +1,27 @@
+from cloudinary.uploader import destroy, upload
+from cloudinary.utils import cloudinary_url
+from django.core.files.storage import Storage
+
+
+class CloudinaryVariantStorage(Storage):
+    """
+    The default "image_variants" storage: keeps variants on Cloudinary next to the originals, so they get absolute
+    URLs served by its CDN. Names are "<public id>.<extension>"; each variant set has its own uuid folder, so
+    nothing is ever overwritten. Write-only: variants are rendered here and only ever read through their URLs.
+    It lives apart from product.images so the variant worker processes never import cloudinary.
+    """
+
+    def _save(self, name, content):
+        public_id, extension = name.rsplit(".", 1)
+        upload(content, public_id=public_id, format=extension, resource_type="image", type="upload", overwrite=False)
+        return name
+
+    def exists(self, name):
+        return False
+
+    def delete(self, name):
+        destroy(name.rsplit(".", 1)[0], resource_type="image", type="upload", invalidate=True)
+
+    def url(self, name):
+        public_id, extension = name.rsplit(".", 1)
+        return cloudinary_url(public_id, format=extension, resource_type="image", type="upload", secure=True)[0]
@@ -1,3 +1,59 @@
 from django.test import TestCase
+from authentication.models import User
+from .models import Product, ProductStockShard
+from .utils import claim_stock, reconcile_stock, start_flash_sale
 
-# Create your tests here.
+
+class FlashSaleStockTests(TestCase):
+    def setUp(self):
+        vendor = User.objects.create_user(
+            first_name="chi", last_name="eze", email="chi@example.com", password="secret123", role=User.VENDOR
+        )
+        self.product = Product.objects.create(vendor=vendor, name="lamp", price=10, stock=10)
+
+    def shard_stock(self):
+        return list(ProductStockShard.objects.filter(product=self.product).order_by("index").values_list("stock", flat=True))
+
+    def test_stock_is_split_across_shards(self):
+        start_flash_sale(self.product, shards=4)
+        self.assertEqual(self.shard_stock(), [3, 3, 2, 2])
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.flash_sale)
+
+    def test_claim_with_a_stale_instance_takes_from_the_shards(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        start_flash_sale(self.product, shards=2)
+        self.assertFalse(stale.flash_sale)
+        self.assertTrue(claim_stock(stale, 3))
+        self.assertEqual(sum(self.shard_stock()), 7)
+        self.assertEqual(reconcile_stock(self.product), 7)
+
+    def test_claim_after_the_sale_ended_takes_from_the_product(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        start_flash_sale(self.product, shards=2)
+        stale.flash_sale = True
+        reconcile_stock(self.product, end_sale=True)
+        self.assertTrue(claim_stock(stale, 4))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 6)
+
+    def test_claim_drains_several_shards_when_no_single_one_is_enough(self):
+        start_flash_sale(self.product, shards=4)
+        self.assertTrue(claim_stock(self.product, 7))
+        self.assertEqual(sum(self.shard_stock()), 3)
+        self.assertFalse(claim_stock(self.product, 4))
+        self.assertEqual(sum(self.shard_stock()), 3)
+
+    def test_claim_fails_when_out_of_stock(self):
+        self.assertFalse(claim_stock(self.product, 11))
+        self.assertTrue(claim_stock(self.product, 10))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_ending_the_sale_folds_the_shards_back(self):
+        start_flash_sale(self.product, shards=3)
+        claim_stock(self.product, 2)
+        self.assertEqual(reconcile_stock(self.product, end_sale=True), 8)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.flash_sale), (8, False))
+        self.assertEqual(self.shard_stock(), [])
@@ -0,0 +1,80 @@
+import hashlib
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+
+
+# Leading bytes of the formats the image endpoints accept (the extension checks only allow jpg/jpeg/png)
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "JPEG",
+    b"\x89PNG\r\n\x1a\n": "PNG",
+}
+SIGNATURE_LENGTH = max(len(signature) for signature in IMAGE_SIGNATURES)
+
+
+class ImageUploadRejected(MultiPartParserError):
+    """Raised while the body is still being read; DRF's MultiPartParser turns it into a 400"""
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Rejects an upload as soon as it breaks a rule, instead of after it has been stored:
+    a Content-Length over MAX_IMAGE_UPLOAD_REQUEST_SIZE is refused before anything is read,
+    each file is cut off at MAX_IMAGE_UPLOAD_SIZE bytes and must start with a JPEG or PNG signature.
+    Data is passed on untouched, so it goes first, ahead of the handlers that store the file.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.received = 0
+        if content_length > settings.MAX_IMAGE_UPLOAD_REQUEST_SIZE:
+            raise ImageUploadRejected(
+                f"Upload is larger than {settings.MAX_IMAGE_UPLOAD_REQUEST_SIZE} bytes."
+            )
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if start + len(raw_data) > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise ImageUploadRejected(f"{self.file_name} is larger than {settings.MAX_IMAGE_UPLOAD_SIZE} bytes.")
+        if self.received > settings.MAX_IMAGE_UPLOAD_REQUEST_SIZE:
+            raise ImageUploadRejected(f"Upload is larger than {settings.MAX_IMAGE_UPLOAD_REQUEST_SIZE} bytes.")
+        if self.head is not None:
+            self.head += raw_data[:SIGNATURE_LENGTH]
+            if len(self.head) >= SIGNATURE_LENGTH:
+                self.check_signature()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.head is not None:
+            self.check_signature()
+        return None
+
+    def check_signature(self):
+        if not any(self.head.startswith(signature) for signature in IMAGE_SIGNATURES):
+            raise ImageUploadRejected(f"{self.file_name} is not a JPEG or PNG image.")
+        self.head = None
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Computes the SHA-256 of each uploaded file while it streams in and passes the data on untouched,
+    so it must come before the handlers that store the file (request.upload_handlers.insert(0, ...)).
+    The digests land in request.upload_digests[field_name], in the order of request.FILES.getlist(field_name).
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, "upload_digests"):
+            self.request.upload_digests = {}
+        self.request.upload_digests.setdefault(self.field_name, []).append(self.hasher.hexdigest())
+        return None
@@ -0,0 +1,262 @@
+import binascii
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from cloudinary.uploader import destroy, upload_resource
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, JSONField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_aware, now
+from .images import create_variants, discard_variants, start_rendering
+from .models import ImageAsset, Product, ProductImage, ProductStockShard, ProductTombstone
+
+
+@transaction.atomic
+def start_flash_sale(product, shards=None):
+    """Split the product's stock across shard rows so concurrent buyers don't queue on one row lock"""
+    shards = shards or settings.FLASH_SALE_STOCK_SHARDS
+    product = Product.objects.select_for_update().get(pk=product.pk)
+    if product.flash_sale:
+        return product
+
+    per_shard, remainder = divmod(max(product.stock, 0), shards)
+    ProductStockShard.objects.filter(product=product).delete()
+    ProductStockShard.objects.bulk_create([
+        ProductStockShard(product=product, index=index, stock=per_shard + (1 if index < remainder else 0))
+        for index in range(shards)
+    ])
+    Product.objects.filter(pk=product.pk).update(flash_sale=True, modified_at=now())
+    product.flash_sale = True
+    return product
+
+
+def claim_stock(product, quantity=1):
+    """
+    Take `quantity` units of stock for a purchase.
+    Returns False when there isn't enough stock left.
+    `product.flash_sale` is only used as a first guess: if a sale started or ended since the instance was loaded,
+    the claim is retried in the other mode.
+    """
+    flash_sale = product.flash_sale
+    for _ in range(2):
+        if flash_sale:
+            claimed = _claim_from_shards(product, quantity)
+        else:
+            # Once start_flash_sale commits, flash_sale=False no longer matches, so stock can't be taken behind its back.
+            claimed = Product.objects.filter(pk=product.pk, flash_sale=False, stock__gte=quantity).update(
+                stock=F("stock") - quantity, modified_at=now()
+            ) == 1
+        if claimed:
+            return True
+        current = Product.objects.filter(pk=product.pk).values_list("flash_sale", flat=True).first()
+        if current is None or current == flash_sale:
+            return False
+        flash_sale = current
+    return False
+
+
+@transaction.atomic
+def _claim_from_shards(product, quantity):
+    shards = ProductStockShard.objects.filter(product_id=product.pk)
+    candidates = shards.filter(stock__gte=quantity)
+    # Pick a random shard nobody else holds; only wait on a lock once every shard is busy.
+    shard = candidates.select_for_update(skip_locked=True).order_by("?").first()
+    if shard is None:
+        shard = candidates.select_for_update().order_by("?").first()
+    if shard is not None:
+        ProductStockShard.objects.filter(pk=shard.pk).update(stock=F("stock") - quantity)
+        return True
+
+    # No single shard holds enough: drain several, locked in index order so two drains can't deadlock.
+    locked = list(shards.filter(stock__gt=0).select_for_update().order_by("index"))
+    if sum(shard.stock for shard in locked) < quantity:
+        return False
+    remaining = quantity
+    for shard in locked:
+        taken = min(shard.stock, remaining)
+        ProductStockShard.objects.filter(pk=shard.pk).update(stock=F("stock") - taken)
+        remaining -= taken
+        if not remaining:
+            break
+    return True
+
+
+@transaction.atomic
+def reconcile_stock(product, end_sale=False):
+    """
+    Fold the shard counts back into Product.stock.
+    With `end_sale` the shards are locked, removed and the product leaves flash-sale mode.
+    """
+    shards = ProductStockShard.objects.filter(product=product)
+    if end_sale:
+        total = sum(shard.stock for shard in shards.select_for_update())
+        shards.delete()
+        Product.objects.filter(pk=product.pk).update(stock=total, flash_sale=False, modified_at=now())
+    else:
+        total = shards.aggregate(total=Sum("stock"))["total"] or 0
+        Product.objects.filter(pk=product.pk).update(stock=total, modified_at=now())
+    return total
+
+
+_upload_pool = None
+
+
+def upload_pool():
+    """Bounded pool shared by all requests, so a burst of uploads can't open unlimited Cloudinary connections"""
+    global _upload_pool
+    if _upload_pool is None:
+        _upload_pool = ThreadPoolExecutor(
+            max_workers=settings.PRODUCT_IMAGE_UPLOAD_WORKERS, thread_name_prefix="image-upload"
+        )
+    return _upload_pool
+
+
+def upload_product_images(files):
+    """
+    Upload image files to Cloudinary concurrently, outside of any transaction.
+    Returns the CloudinaryResources in the order of `files`; ProductImage rows built from them are not uploaded again.
+    If any upload fails the others are deleted and the error is raised.
+    """
+    field = ProductImage._meta.get_field("image")
+    options = {"type": field.type, "resource_type": field.resource_type, **field.options}
+    futures = [upload_pool().submit(upload_resource, file, **options) for file in files]
+
+    uploaded, error = [], None
+    for future in futures:
+        try:
+            uploaded.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        discard_uploads(uploaded)
+        raise error
+    return uploaded
+
+
+def discard_uploads(resources):
+    """Delete uploaded images that never made it into a row"""
+    field = ProductImage._meta.get_field("image")
+    list(upload_pool().map(
+        lambda resource: destroy(resource.public_id, type=field.type, resource_type=field.resource_type), resources
+    ))
+
+
+def upload_image_assets(files, digests, prefix):
+    """
+    Store each distinct content once. Files whose SHA-256 already has an ImageAsset are skipped;
+    the rest are uploaded while their variants render in the process pool, all outside of any transaction.
+    Returns unsaved ImageAssets for the new content, keyed by digest (see `save_image_assets`).
+    """
+    known = set(ImageAsset.objects.filter(sha256__in=digests).values_list("sha256", flat=True))
+    new_files = {}
+    for file, digest in zip(files, digests):
+        if digest not in known:
+            new_files.setdefault(digest, file)
+
+    files = list(new_files.values())
+    rendering = start_rendering(files)
+    try:
+        uploads = upload_product_images(files)
+    except Exception:
+        for future in rendering:
+            if future is not None:
+                future.cancel()
+        raise
+    try:
+        variants = create_variants(files, prefix, rendering, executor=upload_pool())
+    except Exception:
+        discard_uploads(uploads)
+        raise
+    return {
+        digest: ImageAsset(sha256=digest, image=upload, variants=image_variants)
+        for digest, upload, image_variants in zip(new_files, uploads, variants)
+    }
+
+
+def save_image_assets(new_assets, digests):
+    """
+    Insert the new assets and return every asset for `digests`, keyed by digest.
+    When a concurrent request stored the same content first its asset is used, and ours is returned
+    as redundant so the caller can discard it.
+    """
+    ImageAsset.objects.bulk_create(new_assets.values(), ignore_conflicts=True)
+    assets = ImageAsset.objects.in_bulk(digests, field_name="sha256")
+    redundant = [
+        asset for digest, asset in new_assets.items() if assets[digest].image.public_id != asset.image.public_id
+    ]
+    return assets, redundant
+
+
+def discard_image_assets(assets):
+    """Delete the uploads and variant files of assets that never made it into (or were dropped from) the DB"""
+    discard_uploads([asset.image for asset in assets])
+    discard_variants([asset.variants for asset in assets])
+
+
+def refresh_primary_images(product_ids):
+    """
+    Copy each product's first image (lowest id) onto Product.primary_image_url/primary_image_variants
+    in one UPDATE, bumping modified_at. Call it whenever a product's images change.
+    """
+    first_image = ProductImage.objects.filter(product=OuterRef("pk")).order_by("pk")
+    Product.objects.filter(pk__in=product_ids).update(
+        primary_image_url=Coalesce(Subquery(first_image.values("image_url")[:1]), Value("")),
+        primary_image_variants=Coalesce(
+            Subquery(first_image.values("variants")[:1]), Value({}, output_field=JSONField())
+        ),
+        modified_at=now(),
+    )
+
+
+def encode_changes_cursor(timestamp, pk):
+    """Opaque cursor for the changes feed: the (timestamp, id) of the last entry a client has seen"""
+    return urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode().rstrip("=")
+
+
+def decode_changes_cursor(cursor):
+    """(timestamp, id) from encode_changes_cursor; raises ValueError for anything that didn't come from it"""
+    try:
+        timestamp, pk = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|")
+        timestamp, pk = parse_datetime(timestamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
+    if timestamp is None or not is_aware(timestamp):
+        raise ValueError("Invalid cursor")
+    return timestamp, pk
+
+
+def product_changes(cursor=None, limit=100):
+    """
+    Products modified and products deleted (ProductTombstone) after `cursor`, merged in (timestamp, id) order.
+    Returns (products, deleted product ids, next cursor, has_more); at most `limit` entries in total.
+
+    Entries younger than PRODUCT_CHANGES_SETTLE_SECONDS are held back: modified_at is set before the
+    transaction commits, so a row that becomes visible late could otherwise land behind a cursor already handed out.
+    """
+    horizon = now() - timedelta(seconds=settings.PRODUCT_CHANGES_SETTLE_SECONDS)
+    products = Product.objects.filter(modified_at__lt=horizon)
+    tombstones = ProductTombstone.objects.filter(deleted_at__lt=horizon)
+    if cursor is not None:
+        timestamp, pk = cursor
+        products = products.filter(Q(modified_at__gt=timestamp) | Q(modified_at=timestamp, id__gt=pk))
+        tombstones = tombstones.filter(Q(deleted_at__gt=timestamp) | Q(deleted_at=timestamp, product_id__gt=pk))
+
+    # Both queries walk their (timestamp, id) index; limit + 1 tells whether anything is left after this page.
+    products = products.select_related("category", "vendor").order_by("modified_at", "id")[:limit + 1]
+    tombstones = tombstones.order_by("deleted_at", "product_id")[:limit + 1]
+    entries = list(islice(heapq.merge(
+        ((product.modified_at, product.pk, product) for product in products),
+        ((tombstone.deleted_at, tombstone.product_id, tombstone) for tombstone in tombstones),
+        key=lambda entry: entry[:2],
+    ), limit + 1))
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    changed = [entry for _, _, entry in entries if isinstance(entry, Product)]
+    deleted = [entry.product_id for _, _, entry in entries if isinstance(entry, ProductTombstone)]
+    next_cursor = encode_changes_cursor(*entries[-1][:2]) if entries else None
+    return changed, deleted, next_cursor, has_more
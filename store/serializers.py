@@ -2,15 +2,24 @@ from rest_framework import serializers
 from . models import Cart
 from product.models import Product
 from vendor.serializers import ProductSerializer
+from drf_yasg.utils import swagger_serializer_method
 
 
 class CartSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = serializers.SerializerMethodField()
     class Meta:
         model = Cart
         fields = ['id', 'product', 'quantity', 'total_price']
         read_only_fields = ['total_price']
     
+    @swagger_serializer_method(serializer_or_field=ProductSerializer)
+    def get_product(self, obj):
+        """Views pass the cached product fragments in the context (`product_fragments`, keyed by product id)"""
+        fragments = self.context.get("product_fragments") or {}
+        if obj.product_id in fragments:
+            return fragments[obj.product_id]
+        return ProductSerializer(obj.product, context=self.context).data
+    
     
     def validate(self, data):
         if data.get('quantity', 1) < 1:
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from product.models import Product
+from .models import Cart
+from .utils import invalidate_cart_summaries
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def refresh_cart_summary(sender, instance, **kwargs):
+    invalidate_cart_summaries([instance.customer_id])
+
+
+@receiver(post_save, sender=Product)
+def refresh_cart_summaries_for_product(sender, instance, created, update_fields=None, **kwargs):
+    """A product's price feeds the total of every cart holding it; other changes don't touch the summaries"""
+    if created or (update_fields is not None and "price" not in update_fields):
+        return
+    loaded_price = getattr(instance, "_loaded_price", None)
+    instance._loaded_price = instance.price
+    if loaded_price is not None and loaded_price == instance.price:
+        return
+    invalidate_cart_summaries(Cart.objects.filter(product_id=instance.pk).values_list("customer_id", flat=True))
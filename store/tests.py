@@ -1,3 +1,55 @@
+from decimal import Decimal
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from authentication.models import User
+from product.models import Product
+from .models import Cart
 
-# Create your tests here.
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor = User.objects.create_user(
+            first_name="chi", last_name="eze", email="chi@example.com", password="secret123", role=User.VENDOR
+        )
+        self.customer = User.objects.create_user(
+            first_name="ada", last_name="obi", email="ada@example.com", password="secret123", role=User.CUSTOMER
+        )
+        self.product = Product.objects.create(vendor=vendor, name="lamp", price=10, stock=5)
+        Cart.objects.create(customer=self.customer, product=self.product, quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def summary(self):
+        data = self.client.get("/api/store/cart/summary/").json()["data"]
+        return data["item_count"], Decimal(data["total"])
+
+    def test_summary_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.summary(), (2, 20))
+        with self.assertNumQueries(0):
+            self.summary()
+
+    def test_cart_changes_refresh_the_summary(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            Cart.objects.filter(customer=self.customer).get().delete()
+        self.assertEqual(self.summary(), (0, 0))
+
+    def test_price_change_refreshes_the_summary(self):
+        self.summary()
+        product = Product.objects.get(pk=self.product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = 15
+            product.save()
+        self.assertEqual(self.summary(), (2, 30))
+
+    def test_other_product_changes_leave_carts_alone(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.stock = 4
+        # Only the product update; no lookup of the carts holding it
+        with self.assertNumQueries(1):
+            product.save()
+        with self.assertNumQueries(1):
+            product.save(update_fields=["stock"])
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import CartView, CartDetailView
+from .views import CartView, CartDetailView, CartSummaryView
 
 
 
 urlpatterns = [
     path("cart/", CartView.as_view()),
+    path("cart/summary/", CartSummaryView.as_view()),
     path("cart/<int:cart_id>/", CartDetailView.as_view())
 ]
\ No newline at end of file
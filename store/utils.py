@@ -0,0 +1,46 @@
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from vendor.cache import serialize_products
+from vendor.serializers import ProductSerializer
+from .models import Cart
+
+
+def cart_summary_key(customer_id):
+    return f"cart-summary:{customer_id}"
+
+
+def get_cart_summary(customer):
+    """Item count and total of the customer's cart, served from the cache when possible"""
+    key = cart_summary_key(customer.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = Cart.objects.filter(customer=customer).aggregate(
+            item_count=Coalesce(Sum("quantity"), 0),
+            total=Coalesce(
+                Sum(F("quantity") * F("product__price"), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal("0.00")),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        cache.set(key, summary, settings.CART_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summaries(customer_ids):
+    """Drop the cached summaries once the current transaction commits, so a reader can't re-cache old rows"""
+    keys = [cart_summary_key(customer_id) for customer_id in customer_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def product_fragments_context(request, cart_items):
+    """Serializer context for CartSerializer with every embedded product read from the fragment cache at once"""
+    context = {"request": request}
+    products = [item.product for item in cart_items]
+    fragments = serialize_products(products, ProductSerializer, context, prefetch=["images"])
+    context["product_fragments"] = {product.pk: fragment for product, fragment in zip(products, fragments)}
+    return context
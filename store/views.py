@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.generics import get_object_or_404, GenericAPIView
 from .models import Cart
 from .serializers import CartSerializer
+from .utils import get_cart_summary, product_fragments_context
 from authentication.permissions import IsCustomer
 from rest_framework import status, permissions
 from django.db import transaction
@@ -24,8 +25,8 @@ class CartView(GenericAPIView):
     )
     
     def get(self, request):
-        cart_items = Cart.objects.filter(customer=request.user)
-        serializer = self.serializer_class(cart_items, many=True)
+        cart_items = list(Cart.objects.filter(customer=request.user).select_related("product__category", "product__vendor"))
+        serializer = self.serializer_class(cart_items, many=True, context=product_fragments_context(request, cart_items))
         return Response(
             {
                 "success": True,
@@ -68,6 +69,45 @@ class CartView(GenericAPIView):
 
 
 
+class CartSummaryView(GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsCustomer]
+    
+    
+    @swagger_auto_schema(
+        operation_summary="Cart summary",
+        operation_description="Item count (sum of quantities) and total of the authenticated user's cart, for badges and headers.",
+        responses={
+            200: openapi.Response(
+                "Cart summary",
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "success": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        "data": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "item_count": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                "total": openapi.Schema(type=openapi.TYPE_STRING),
+                            }
+                        )
+                    }
+                )
+            )
+        }
+    )
+    
+    def get(self, request):
+        summary = get_cart_summary(request.user)
+        return Response(
+            {
+                "success": True,
+                "data": {"item_count": summary["item_count"], "total": str(summary["total"])}
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+
 class CartDetailView(GenericAPIView):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated, IsCustomer]
@@ -91,7 +131,7 @@ class CartDetailView(GenericAPIView):
     def get(self, request, cart_id):
         """Retrieve details of a specific cart item"""
         cart_item = self.get_object(cart_id)
-        serializer = self.serializer_class(cart_item)
+        serializer = self.serializer_class(cart_item, context=product_fragments_context(request, [cart_item]))
         return Response(
             {"success": True, "data": serializer.data},
             status=status.HTTP_200_OK